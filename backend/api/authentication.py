@@ -1,4 +1,31 @@
-from rest_framework.authentication import SessionAuthentication
+"""
+Authentication classes for the API.
+
+Browser clients use session cookies. Other clients can use stateless signed
+tokens instead: POST /api/auth/token/ returns a short-lived access token and
+a longer-lived refresh token, and requests send
+`Authorization: Bearer <access token>`. Token requests never read the session
+store; the access token carries the user id and is_trainer, and the user row
+is loaded by primary key.
+
+Every token carries a fingerprint of the user's password hash, so changing or
+resetting the password revokes all outstanding tokens. Refresh tokens also
+carry the time of the original login and are never renewed past
+JWT_REFRESH_TOKEN_MAX_LIFETIME from it.
+"""
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication, BaseAuthentication, get_authorization_header
+
+from .backends import users_with_profiles
+
+ACCESS_TOKEN = 'access'
+REFRESH_TOKEN = 'refresh'
+
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     """
@@ -8,3 +35,107 @@ class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request):
         # Skip CSRF check for API requests
         return
+
+
+def credential_fingerprint(user):
+    """A short HMAC of the user's password hash; it changes whenever the password does."""
+    return salted_hmac(
+        'api.authentication.credential_fingerprint', user.password, secret=settings.JWT_SIGNING_KEY
+    ).hexdigest()[:16]
+
+
+def encode_token(user, token_type, lifetime, auth_time):
+    now = datetime.now(timezone.utc)
+    exp = now + timedelta(seconds=lifetime)
+    if token_type == REFRESH_TOKEN:
+        exp = min(exp, auth_time + timedelta(seconds=settings.JWT_REFRESH_TOKEN_MAX_LIFETIME))
+    payload = {
+        'type': token_type,
+        'user_id': user.pk,
+        'is_trainer': user.is_trainer,
+        'pwd': credential_fingerprint(user),
+        'auth_time': int(auth_time.timestamp()),
+        'iat': now,
+        'exp': exp,
+    }
+    return jwt.encode(payload, settings.JWT_SIGNING_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def issue_tokens(user, claims=None):
+    """
+    Return a fresh access/refresh token pair for user. When refreshing, pass
+    the refresh token's claims so the pair keeps the original login time.
+    """
+    if claims is None:
+        auth_time = datetime.now(timezone.utc)
+    else:
+        auth_time = datetime.fromtimestamp(claims['auth_time'], timezone.utc)
+    return {
+        'access': encode_token(user, ACCESS_TOKEN, settings.JWT_ACCESS_TOKEN_LIFETIME, auth_time),
+        'refresh': encode_token(user, REFRESH_TOKEN, settings.JWT_REFRESH_TOKEN_LIFETIME, auth_time),
+        'access_expires_in': settings.JWT_ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def decode_token(token, token_type):
+    """
+    Verify a token's signature, expiry and type and return its claims.
+    Raises AuthenticationFailed if any check fails.
+    """
+    try:
+        claims = jwt.decode(
+            token,
+            settings.JWT_SIGNING_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            options={'require': ['exp', 'iat', 'user_id', 'type', 'pwd', 'auth_time']}
+        )
+    except jwt.ExpiredSignatureError:
+        raise exceptions.AuthenticationFailed('Token has expired')
+    except jwt.InvalidTokenError:
+        raise exceptions.AuthenticationFailed('Invalid token')
+    if claims['type'] != token_type:
+        raise exceptions.AuthenticationFailed('Invalid token type')
+    return claims
+
+
+def get_token_user(claims):
+    """
+    Load the active user a token was issued to, with both profiles, in one query.
+    Tokens issued before the user's last password change are rejected.
+    """
+    try:
+        user = users_with_profiles().get(pk=claims['user_id'], is_active=True)
+    except users_with_profiles().model.DoesNotExist:
+        raise exceptions.AuthenticationFailed('User not found or inactive')
+    if not constant_time_compare(claims['pwd'], credential_fingerprint(user)):
+        raise exceptions.AuthenticationFailed('Token has been revoked')
+    return user
+
+
+class JWTAuthentication(BaseAuthentication):
+    """
+    Stateless authentication with `Authorization: Bearer <access token>`.
+    request.auth holds the token claims. Their is_trainer is a snapshot from
+    when the token was issued; permission checks read request.user, which is
+    loaded fresh on every request, so role changes apply immediately.
+    """
+    keyword = b'bearer'
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword:
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid Authorization header')
+
+        claims = decode_token(header[1].decode('latin-1'), ACCESS_TOKEN)
+        return get_token_user(claims), claims
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+# Authentication for API views: session cookies first (browser clients), then
+# bearer tokens. Listing the session class first keeps unauthenticated
+# responses as 403 for the browser app.
+API_AUTHENTICATION_CLASSES = [CsrfExemptSessionAuthentication, JWTAuthentication]
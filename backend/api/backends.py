@@ -0,0 +1,55 @@
+"""
+Authentication backends that load session users together with their profiles.
+
+ProfileModelBackend resolves the session user with UserProfile and
+TrainerProfile joined in, so serializing request.user with UserSerializer
+costs no further queries. CachedModelBackend additionally keeps that user in
+the cache under auth:user:<id>. The entry is dropped once a save or delete of the
+user or one of their profiles commits (see signals.py), so password changes,
+deactivation and profile edits made through save() take effect on the next
+request. Queryset .update() calls bypass the signals and must call
+invalidate_cached_user() themselves.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 5 * 60  # seconds
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def users_with_profiles():
+    """User queryset joining both profiles, so UserSerializer needs no further queries."""
+    return get_user_model().objects.select_related('profile', 'trainer_profile')
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend whose get_user() loads the user and both profiles in one query."""
+
+    def get_user(self, user_id):
+        try:
+            user = users_with_profiles().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class CachedModelBackend(ProfileModelBackend):
+    """ProfileModelBackend whose get_user() is served from the cache when possible."""
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,24 @@
+"""
+Password hashers with deployment-tunable cost.
+
+Django re-hashes a password on a successful check_password() whenever the
+stored hash was made by a different algorithm than the first entry in
+PASSWORD_HASHERS, or by the same algorithm with different parameters. Reading
+the PBKDF2 iteration count from settings means changing
+PASSWORD_PBKDF2_ITERATIONS (or PASSWORD_HASHER) moves users onto the new cost
+as they log in, without forcing password resets. Use
+`manage.py benchmark_password_hashers` to pick a cost for the deployment box.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count taken from PASSWORD_PBKDF2_ITERATIONS."""
+
+    # Same algorithm name as Django's hasher, so existing hashes verify as-is
+    algorithm = 'pbkdf2_sha256'
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.backends import invalidate_cached_user
+from api.models import CustomUser
+
+PROFILES = {
+    'default (db sessions, ProfileModelBackend)': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['api.backends.ProfileModelBackend'],
+    },
+    'cached (cached_db sessions, CachedModelBackend)': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['api.backends.CachedModelBackend'],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares per-request queries and latency of /api/auth/me/ under the session/auth profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"GET /api/auth/me/ x {options['requests']} per profile (cache: {settings.CACHES['default']['BACKEND']})")
+        for name, profile in PROFILES.items():
+            with transaction.atomic():
+                with override_settings(**profile):
+                    queries, auth_queries, durations = self.measure(options['requests'])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{name}: {queries} queries/request ({auth_queries} session/user), "
+                f"p50 {statistics.median(durations):.2f} ms, "
+                f"p99 {durations[int(len(durations) * 0.99) - 1]:.2f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def measure(self, requests):
+        """Log a throwaway user in and time warm requests; returns (queries, session/user queries, sorted ms)."""
+        user = CustomUser.objects.create_user(username='benchmark_auth_user', password='BenchmarkPass123!')
+        client = Client()
+        client.force_login(user)
+        client.get('/api/auth/me/')  # warm the session and user caches
+
+        durations = []
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get('/api/auth/me/')
+                durations.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+
+        invalidate_cached_user(user.pk)
+        auth_queries = sum(
+            1 for query in captured.captured_queries
+            if 'django_session' in query['sql'] or 'FROM "users"' in query['sql'] or 'FROM `users`' in query['sql']
+        )
+        return len(captured) / requests, auth_queries / requests, sorted(durations)
@@ -0,0 +1,128 @@
+import logging
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from api.models import CustomUser
+from api.throttling import reset_login_throttle
+
+PASSWORD = 'BenchmarkPass123!'
+THROTTLE_OFF = {
+    'LOGIN_THROTTLE_IP_RATE': None,
+    'LOGIN_THROTTLE_IDENTIFIER_RATE': None,
+    'LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE': None,
+}
+
+
+class Command(BaseCommand):
+    help = 'Measures legitimate login latency during a credential-stuffing burst, with and without the login throttle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=10, help='Legitimate logins per phase')
+        parser.add_argument('--attackers', type=int, default=4, help='Attacking threads')
+        parser.add_argument(
+            '--attack-rate', type=float, default=40,
+            help='Attempts per second offered by all attackers together (same load in both attack phases)'
+        )
+        parser.add_argument('--victims', type=int, default=2, help='Accounts targeted by the attack')
+        parser.add_argument(
+            '--warmup', type=float, default=10,
+            help='Seconds the attack runs before measuring (long enough to drain the bursts)'
+        )
+
+    def handle(self, *args, **options):
+        # Every rejected attempt would otherwise log a warning
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        self.warmup = options['warmup']
+        self.attack_interval = options['attackers'] / options['attack_rate']
+
+        # All accounts share one hash so setup doesn't pay for hundreds of PBKDF2 runs
+        password_hash = make_password(PASSWORD)
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_{kind}_{i}', email=f'bench_{kind}_{i}@example.com', password=password_hash)
+            for kind, count in (('legit', options['logins'] * 3), ('victim', options['victims']))
+            for i in range(count)
+        ])
+        legit = [user.username for user in users if user.username.startswith('bench_legit_')]
+        victims = [user.username for user in users if user.username.startswith('bench_victim_')]
+
+        try:
+            self.stdout.write(
+                f"{options['logins']} legitimate logins per phase, "
+                f"{options['attackers']} attacking threads offering {options['attack_rate']:.0f} attempts/s "
+                f"against {len(victims)} accounts"
+            )
+            phases = [
+                ('no attack', {}, 0, legit[:options['logins']]),
+                ('attack, throttle off', THROTTLE_OFF, options['attackers'], legit[options['logins']:2 * options['logins']]),
+                ('attack, throttle on', {}, options['attackers'], legit[2 * options['logins']:]),
+            ]
+            for name, overrides, attackers, usernames in phases:
+                reset_login_throttle()
+                with override_settings(**overrides):
+                    durations, served, rejected = self.run_phase(usernames, victims, attackers)
+                self.stdout.write(
+                    f"{name}: legit p50 {statistics.median(durations):.0f} ms, max {max(durations):.0f} ms; "
+                    f"attack attempts during measurement: checked {served}, rejected {rejected}"
+                )
+        finally:
+            CustomUser.objects.filter(username__startswith='bench_').delete()
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def run_phase(self, usernames, victims, attackers):
+        """Log each legitimate user in once while attacker threads hammer the victims."""
+        stop = threading.Event()
+        counts = {401: 0, 429: 0}
+        lock = threading.Lock()
+
+        def attack(thread_index):
+            client = Client()
+            attempt = 0
+            nonlocal counts
+            try:
+                next_attempt = time.perf_counter()
+                while not stop.is_set():
+                    # Pace to the offered rate; a slow server just falls behind it
+                    next_attempt += self.attack_interval
+                    stop.wait(max(0, next_attempt - time.perf_counter()))
+                    response = client.post(
+                        '/api/auth/login/',
+                        {'login': victims[attempt % len(victims)], 'password': 'WrongPass123!'},
+                        content_type='application/json',
+                        REMOTE_ADDR=f'10.66.0.{thread_index}'
+                    )
+                    attempt += 1
+                    with lock:
+                        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attack, args=(i,)) for i in range(attackers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.warmup if attackers else 0)
+        with lock:
+            counts = {401: 0, 429: 0}
+
+        durations = []
+        for index, username in enumerate(usernames):
+            client = Client()
+            started = time.perf_counter()
+            response = client.post(
+                '/api/auth/login/',
+                {'login': username, 'password': PASSWORD},
+                content_type='application/json',
+                REMOTE_ADDR=f'192.168.1.{index}'
+            )
+            durations.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return durations, counts.get(401, 0), counts.get(429, 0)
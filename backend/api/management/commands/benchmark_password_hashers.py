@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api.hashers import ConfigurablePBKDF2PasswordHasher
+
+PASSWORD = 'BenchmarkPass123!'
+
+
+class Command(BaseCommand):
+    help = 'Measures password verification cost and login throughput per core for each hasher and PBKDF2 iteration count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default='260000,390000,600000,870000,1200000',
+                            help='Comma-separated PBKDF2 iteration counts to measure')
+        parser.add_argument('--hashers', default='pbkdf2_sha256,scrypt,argon2,bcrypt_sha256',
+                            help=f"Comma-separated hashers from: {', '.join(settings.PASSWORD_HASHER_CHOICES)}")
+        parser.add_argument('--rounds', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        self.stdout.write(
+            f"check_password x {rounds} per configuration "
+            f"(configured: {settings.PASSWORD_HASHER}, {settings.PASSWORD_PBKDF2_ITERATIONS} PBKDF2 iterations)"
+        )
+        for name in options['hashers'].split(','):
+            name = name.strip()
+            if name not in settings.PASSWORD_HASHER_CHOICES:
+                self.stdout.write(self.style.WARNING(f'{name}: unknown hasher, skipped'))
+                continue
+            if name == ConfigurablePBKDF2PasswordHasher.algorithm:
+                for iterations in options['iterations'].split(','):
+                    with override_settings(PASSWORD_PBKDF2_ITERATIONS=int(iterations)):
+                        self.report(f'{name} ({int(iterations)} iterations)', name, rounds)
+            else:
+                self.report(name, name, rounds)
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def report(self, label, name, rounds):
+        try:
+            durations = self.measure(name, rounds)
+        except ValueError as e:
+            # Argon2 and bcrypt need optional packages
+            self.stdout.write(self.style.WARNING(f'{label}: unavailable ({e})'))
+            return
+        median = statistics.median(durations)
+        self.stdout.write(
+            f'{label}: p50 {median:.1f} ms, max {max(durations):.1f} ms, '
+            f'~{1000 / median:.1f} logins/s per core'
+        )
+
+    def measure(self, name, rounds):
+        """Hash once with the named hasher, then time verifications; returns ms per check."""
+        hasher = get_hasher(name)
+        encoded = make_password(PASSWORD, hasher=hasher)
+        hasher.verify(PASSWORD, encoded)  # warm up
+
+        durations = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            assert hasher.verify(PASSWORD, encoded)
+            durations.append((time.perf_counter() - started) * 1000)
+        return durations
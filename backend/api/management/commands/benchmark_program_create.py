@@ -0,0 +1,112 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import WorkoutPlan, ProgramSection, Exercise, ExerciseSet, tree_counts_managed
+from api.serializers import WorkoutPlanSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares row-by-row and bulk nested program creation on a synthetic program'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=6)
+        parser.add_argument('--exercises', type=int, default=8, help='Exercises per day')
+        parser.add_argument('--sets', type=int, default=4, help='Sets per exercise')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options['days'], options['exercises'], options['sets'])
+
+        self.stdout.write(
+            f"Synthetic program: {options['days']} days x {options['exercises']} exercises "
+            f"x {options['sets']} sets, {options['repeat']} runs each"
+        )
+
+        row_time, row_queries = self.measure(self.create_row_by_row, payload, options['repeat'])
+        bulk_time, bulk_queries = self.measure(self.create_bulk, payload, options['repeat'])
+
+        self.stdout.write(f"Row-by-row: {row_time * 1000:.1f} ms, {row_queries} queries")
+        self.stdout.write(f"Bulk:       {bulk_time * 1000:.1f} ms, {bulk_queries} queries")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {row_time / bulk_time:.1f}x"))
+
+    def build_payload(self, days, exercises, sets):
+        """Build validated nested data for a synthetic program."""
+        serializer = WorkoutPlanSerializer(data={
+            'name': 'Benchmark Program',
+            'description': 'Synthetic program for benchmarking',
+            'focus': ['strength'],
+            'difficulty': 'intermediate',
+            'weekly_frequency': days,
+            'session_length': 60,
+            'sections': [
+                {
+                    'format': f'Day {day + 1}',
+                    'type': 'Full Body',
+                    'is_rest_day': False,
+                    'exercises': [
+                        {
+                            'name': f'Exercise {exercise + 1}',
+                            'order': exercise,
+                            'sets': [
+                                {'set_number': set_number, 'reps': 10, 'time': None, 'rest': 60}
+                                for set_number in range(1, sets + 1)
+                            ]
+                        }
+                        for exercise in range(exercises)
+                    ]
+                }
+                for day in range(days)
+            ]
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def measure(self, create, payload, repeat):
+        """Return the median duration and query count of create(payload), rolled back each run."""
+        durations = []
+        query_count = 0
+        for _ in range(repeat):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    create(payload)
+                    durations.append(time.perf_counter() - started)
+                query_count = len(queries)
+                transaction.set_rollback(True)
+        durations.sort()
+        return durations[len(durations) // 2], query_count
+
+    def create_bulk(self, payload):
+        """Create through WorkoutPlanSerializer (one bulk INSERT per level)."""
+        data = dict(payload)
+        WorkoutPlanSerializer().create(data)
+
+    def create_row_by_row(self, payload):
+        """
+        Reference implementation issuing one INSERT per section, exercise and set.
+        Like the serializer, it stores the tree counts itself once at the end, so
+        the per-row signal recounts do not skew the comparison.
+        """
+        with tree_counts_managed():
+            plan = self.create_tree_row_by_row(payload)
+        plan.refresh_tree_counts()
+
+    def create_tree_row_by_row(self, payload):
+        """Write the same field values as the serializer, one row at a time."""
+        data = dict(payload)
+        sections_data = data.pop('sections', [])
+        plan = WorkoutPlan.objects.create(**data)
+        for section_order, section_data in enumerate(sections_data):
+            section = ProgramSection.objects.create(
+                program=plan, **WorkoutPlanSerializer.section_values(section_data, section_order)
+            )
+            for exercise_order, exercise_data in enumerate(section_data.get('exercises', [])):
+                exercise = Exercise.objects.create(
+                    section=section, **WorkoutPlanSerializer.exercise_values(exercise_data, exercise_order)
+                )
+                for set_data in exercise_data.get('sets', []):
+                    ExerciseSet.objects.create(exercise=exercise, **WorkoutPlanSerializer.set_values(set_data))
+        return plan
@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.models import VALID_FOCUS_OPTIONS
+from api.recommendations import RecommendationEngine, EXPERIENCE_LEVELS
+
+
+class Command(BaseCommand):
+    help = 'Measures recommendation ranking latency on a synthetic in-memory catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', type=int, default=100_000)
+        parser.add_argument('--runs', type=int, default=500)
+        parser.add_argument('--top', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        plans = options['plans']
+
+        engine = RecommendationEngine(
+            plan_ids=np.arange(1, plans + 1),
+            focus=rng.random((plans, len(VALID_FOCUS_OPTIONS))) < 0.35,
+            difficulty=rng.integers(0, len(EXPERIENCE_LEVELS), plans),
+            session_length=rng.choice([20, 30, 45, 60, 75, 90], plans),
+            enrollments=rng.zipf(2.0, plans) - 1,
+        )
+        matrix_bytes = sum(
+            array.nbytes for array in
+            (engine.plan_ids, engine.focus, engine.difficulty, engine.session_length, engine.popularity)
+        )
+
+        durations = []
+        for run in range(options['runs']):
+            focus = list(rng.choice(VALID_FOCUS_OPTIONS, size=rng.integers(1, 3), replace=False))
+            level = EXPERIENCE_LEVELS[run % len(EXPERIENCE_LEVELS)]
+            location = 'home' if run % 2 else 'gym'
+
+            started = time.perf_counter()
+            engine.rank(focus, level, location, k=options['top'])
+            durations.append((time.perf_counter() - started) * 1000)
+
+        durations = np.array(durations)
+        self.stdout.write(f"Catalog: {plans} plans, {matrix_bytes / 1024:.0f} KiB of feature arrays")
+        self.stdout.write(
+            f"rank(k={options['top']}) over {options['runs']} runs: "
+            f"p50 {np.percentile(durations, 50):.2f} ms, "
+            f"p99 {np.percentile(durations, 99):.2f} ms, "
+            f"max {durations.max():.2f} ms"
+        )
+        self.stdout.write(self.style.SUCCESS('Done'))
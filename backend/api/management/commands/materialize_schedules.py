@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.occurrences import (
+    materialize_active_schedules, occurrence_weeks, prune_occurrences, retention_cutoff, users_training_on,
+)
+
+
+class Command(BaseCommand):
+    help = 'Extends materialized schedule occurrences for active schedules and prunes expired ones (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this YYYY-MM-DD date as today')
+        parser.add_argument(
+            '--who-trains',
+            action='store_true',
+            help='Also report how many users have a workout scheduled on that date'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Use YYYY-MM-DD')
+        else:
+            today = timezone.localdate()
+
+        pruned = prune_occurrences(today)
+        self.stdout.write(f'Pruned {pruned} occurrence(s) before {retention_cutoff(today).isoformat()}')
+
+        if occurrence_weeks() <= 0:
+            self.stdout.write('SCHEDULE_OCCURRENCE_WEEKS is 0, nothing to materialize')
+            return
+
+        touched, days = materialize_active_schedules(today)
+        self.stdout.write(self.style.SUCCESS(
+            f'Extended {touched} schedule(s) by {days} day(s) through {occurrence_weeks()} weeks ahead'
+        ))
+
+        if options['who_trains']:
+            self.stdout.write(f'Users training on {today.isoformat()}: {users_training_on(today).count()}')
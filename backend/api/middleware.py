@@ -0,0 +1,27 @@
+"""
+Middleware for the API.
+
+LegacySessionBackendMiddleware keeps sessions logged in after the
+authentication backend changes. Django only resolves a session whose recorded
+backend is in AUTHENTICATION_BACKENDS, and every listed backend is tried on a
+failed authenticate(), so each extra entry costs one more password hash per
+bad login. Instead, only the current backend is listed and sessions recorded
+under one of LEGACY_AUTHENTICATION_BACKENDS are moved onto it before
+AuthenticationMiddleware reads them.
+"""
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+
+
+class LegacySessionBackendMiddleware:
+    """Rewrite a legacy session backend path to the current backend. Must run before AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        backend_path = request.session.get(BACKEND_SESSION_KEY)
+        current_path = settings.AUTHENTICATION_BACKENDS[0]
+        if backend_path != current_path and backend_path in settings.LEGACY_AUTHENTICATION_BACKENDS:
+            request.session[BACKEND_SESSION_KEY] = current_path
+        return self.get_response(request)
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:24
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_tree_counts(apps, schema_editor):
+    """Compute section/exercise/set counts for existing plans."""
+    WorkoutPlan = apps.get_model('api', 'WorkoutPlan')
+
+    plans = WorkoutPlan.objects.annotate(
+        days=Count('sections', filter=Q(sections__is_rest_day=False), distinct=True),
+        exercises=Count('sections__exercises', distinct=True),
+        sets=Count('sections__exercises__sets', distinct=True),
+    )
+    for plan in plans.iterator():
+        WorkoutPlan.objects.filter(pk=plan.pk).update(
+            day_count=plan.days,
+            exercise_count=plan.exercises,
+            set_count=plan.sets,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_add_default_exercises'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutplan',
+            name='day_count',
+            field=models.IntegerField(default=0, help_text='Number of non-rest sections'),
+        ),
+        migrations.AddField(
+            model_name='workoutplan',
+            name='exercise_count',
+            field=models.IntegerField(default=0, help_text='Number of exercises across all sections'),
+        ),
+        migrations.AddField(
+            model_name='workoutplan',
+            name='set_count',
+            field=models.IntegerField(default=0, help_text='Number of sets across all exercises'),
+        ),
+        migrations.RunPython(backfill_tree_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_workoutplan_tree_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['is_deleted', 'created_at', 'id'], name='workout_plans_catalog_idx'),
+        ),
+    ]
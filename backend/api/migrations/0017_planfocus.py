@@ -0,0 +1,50 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+VALID_FOCUS_OPTIONS = ['strength', 'cardio', 'flexibility', 'balance']
+
+
+def backfill_plan_focus(apps, schema_editor):
+    """Create PlanFocus rows from each plan's focus list."""
+    WorkoutPlan = apps.get_model('api', 'WorkoutPlan')
+    PlanFocus = apps.get_model('api', 'PlanFocus')
+
+    rows = []
+    for plan_id, focus in WorkoutPlan.objects.values_list('id', 'focus').iterator():
+        if not isinstance(focus, list):
+            continue
+        rows.extend(
+            PlanFocus(plan_id=plan_id, focus=f)
+            for f in sorted(set(focus)) if f in VALID_FOCUS_OPTIONS
+        )
+    PlanFocus.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_workoutplan_catalog_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanFocus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('focus', models.CharField(max_length=20)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='focus_tags', to='api.workoutplan')),
+            ],
+            options={
+                'db_table': 'plan_focuses',
+                'indexes': [models.Index(fields=['focus', 'plan'], name='plan_focuse_focus_1127da_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='planfocus',
+            constraint=models.UniqueConstraint(fields=('plan', 'focus'), name='unique_focus_per_plan'),
+        ),
+        migrations.RunPython(backfill_plan_focus, migrations.RunPython.noop),
+    ]
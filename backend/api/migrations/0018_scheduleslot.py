@@ -0,0 +1,92 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DAYS_OF_WEEK = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def copy_weekly_schedules_to_slots(apps, schema_editor):
+    """Turn each schedule's weekly_schedule JSON into ScheduleSlot rows."""
+    UserSchedule = apps.get_model('api', 'UserSchedule')
+    ProgramSection = apps.get_model('api', 'ProgramSection')
+    ScheduleSlot = apps.get_model('api', 'ScheduleSlot')
+
+    program_by_section = dict(ProgramSection.objects.values_list('id', 'program_id'))
+
+    slots = []
+    for schedule_id, weekly_schedule in UserSchedule.objects.values_list('id', 'weekly_schedule').iterator():
+        if not isinstance(weekly_schedule, dict):
+            continue
+        for weekday, day_name in enumerate(DAYS_OF_WEEK):
+            section_ids = weekly_schedule.get(day_name, [])
+            if not isinstance(section_ids, list):
+                section_ids = [section_ids] if section_ids != 'rest' else []
+
+            seen = set()
+            for section_id in section_ids:
+                # Skip sections that no longer exist and duplicates within a day
+                if section_id not in program_by_section or section_id in seen:
+                    continue
+                seen.add(section_id)
+                slots.append(ScheduleSlot(
+                    schedule_id=schedule_id,
+                    weekday=weekday,
+                    section_id=section_id,
+                    program_id=program_by_section[section_id],
+                    position=len(seen) - 1,
+                ))
+
+    ScheduleSlot.objects.bulk_create(slots, batch_size=1000)
+
+
+def copy_slots_to_weekly_schedules(apps, schema_editor):
+    """Rebuild weekly_schedule JSON from ScheduleSlot rows."""
+    UserSchedule = apps.get_model('api', 'UserSchedule')
+    ScheduleSlot = apps.get_model('api', 'ScheduleSlot')
+
+    weekly_schedules = {}
+    for schedule_id, weekday, section_id in ScheduleSlot.objects.order_by('weekday', 'position').values_list(
+        'schedule_id', 'weekday', 'section_id'
+    ):
+        days = weekly_schedules.setdefault(schedule_id, {day: [] for day in DAYS_OF_WEEK})
+        days[DAYS_OF_WEEK[weekday]].append(section_id)
+
+    for schedule_id, weekly_schedule in weekly_schedules.items():
+        UserSchedule.objects.filter(id=schedule_id).update(weekly_schedule=weekly_schedule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_planfocus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Day of the weekly template (0 = Monday)')),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Order of this section within the day')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_slots', to='api.workoutplan')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='api.userschedule')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_slots', to='api.programsection')),
+            ],
+            options={
+                'db_table': 'schedule_slots',
+                'ordering': ['weekday', 'position'],
+                'indexes': [models.Index(fields=['schedule', 'weekday', 'position'], name='schedule_sl_schedul_08e5c3_idx'), models.Index(fields=['schedule', 'program'], name='schedule_sl_schedul_e9fb28_idx'), models.Index(fields=['section', 'weekday'], name='schedule_sl_section_f8b51b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleslot',
+            constraint=models.UniqueConstraint(fields=('schedule', 'weekday', 'section'), name='unique_section_per_schedule_day'),
+        ),
+        migrations.RunPython(copy_weekly_schedules_to_slots, copy_slots_to_weekly_schedules),
+        migrations.RemoveField(
+            model_name='userschedule',
+            name='weekly_schedule',
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_scheduleslot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userschedule',
+            name='materialized_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userschedule',
+            name='materialized_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ScheduleOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_occurrences', to='api.workoutplan')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='api.userschedule')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='api.programsection')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_occurrences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'schedule_occurrences',
+                'ordering': ['date', 'position'],
+                'indexes': [models.Index(fields=['user', 'date'], name='schedule_oc_user_id_fc736f_idx'), models.Index(fields=['schedule', 'date'], name='schedule_oc_schedul_dc48a1_idx'), models.Index(fields=['date', 'user'], name='schedule_oc_date_3ef67a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleoccurrence',
+            constraint=models.UniqueConstraint(fields=('schedule', 'date', 'section'), name='unique_section_per_schedule_date'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_active_user(apps, schema_editor):
+    """
+    Keep only each user's newest active schedule active, then point
+    active_user at the owner of every remaining active schedule.
+    """
+    UserSchedule = apps.get_model('api', 'UserSchedule')
+
+    seen_users = set()
+    stale_ids = []
+    active = UserSchedule.objects.filter(is_active=True).order_by('user_id', '-created_at', '-id')
+    for schedule_id, user_id in active.values_list('id', 'user_id').iterator():
+        if user_id in seen_users:
+            stale_ids.append(schedule_id)
+        seen_users.add(user_id)
+    UserSchedule.objects.filter(id__in=stale_ids).update(is_active=False)
+
+    UserSchedule.objects.filter(is_active=True).update(active_user_id=models.F('user_id'))
+
+
+def clear_active_user(apps, schema_editor):
+    UserSchedule = apps.get_model('api', 'UserSchedule')
+    UserSchedule.objects.update(active_user=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_scheduleoccurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userschedule',
+            name='active_user',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='active_schedule', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_active_user, clear_active_user),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+BATCH_SIZE = 1000
+
+
+def find_conflicts(CustomUser):
+    """Map each normalized email shared by several users to their ids, in one grouped query."""
+    shared = (
+        CustomUser.objects.annotate(normalized=Lower(Trim('email')))
+        .values('normalized')
+        .annotate(users=Count('id'))
+        .filter(users__gt=1)
+        .values_list('normalized', flat=True)
+    )
+    conflicts = {}
+    for user_id, email in (
+        CustomUser.objects.annotate(normalized=Lower(Trim('email')))
+        .filter(normalized__in=list(shared))
+        .order_by('id')
+        .values_list('id', 'email')
+    ):
+        conflicts.setdefault(email.strip().lower(), []).append(user_id)
+    return conflicts
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Lower-case and trim every stored email, walking the table in primary-key
+    batches. Lookups by email are exact once this runs, so an address whose
+    normalized form belongs to several users would lock all but one of them
+    out; those accounts need a human to merge or re-address them, and the
+    migration refuses to run until they are resolved.
+    """
+    CustomUser = apps.get_model('api', 'CustomUser')
+
+    conflicts = find_conflicts(CustomUser)
+    if conflicts:
+        details = '; '.join(f'{email}: user ids {ids}' for email, ids in sorted(conflicts.items()))
+        raise RuntimeError(
+            f'{len(conflicts)} email(s) differ only by case or whitespace ({details}). '
+            'Merge these accounts or change their emails, then run migrate again.'
+        )
+
+    last_id = 0
+    while True:
+        batch = list(
+            CustomUser.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'email')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        changed = []
+        for user in batch:
+            normalized = (user.email or '').strip().lower()
+            if normalized != user.email:
+                user.email = normalized
+                changed.append(user)
+        CustomUser.objects.bulk_update(changed, ['email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_userschedule_active_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.8 on 2026-10-17 01:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TRAINER_SPECIALTIES = ['strength', 'cardio', 'flexibility', 'sports', 'rehabilitation']
+
+
+def backfill_trainer_specialties(apps, schema_editor):
+    """Create TrainerSpecialty rows from each trainer's specialty_* flags."""
+    TrainerProfile = apps.get_model('api', 'TrainerProfile')
+    TrainerSpecialty = apps.get_model('api', 'TrainerSpecialty')
+
+    flags = [f'specialty_{name}' for name in TRAINER_SPECIALTIES]
+    rows = []
+    for trainer_id, *selected in TrainerProfile.objects.values_list('id', *flags).iterator():
+        rows.extend(
+            TrainerSpecialty(trainer_id=trainer_id, specialty=name)
+            for name, is_selected in zip(TRAINER_SPECIALTIES, selected) if is_selected
+        )
+    TrainerSpecialty.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_normalize_user_emails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerSpecialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialty', models.CharField(max_length=20)),
+            ],
+            options={
+                'db_table': 'trainer_specialties',
+            },
+        ),
+        migrations.AddField(
+            model_name='trainerspecialty',
+            name='trainer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialty_tags', to='api.trainerprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='trainerspecialty',
+            index=models.Index(fields=['specialty', 'trainer'], name='trainer_spe_special_b816a7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trainerspecialty',
+            constraint=models.UniqueConstraint(fields=('trainer', 'specialty'), name='unique_specialty_per_trainer'),
+        ),
+        migrations.RunPython(backfill_trainer_specialties, migrations.RunPython.noop),
+    ]
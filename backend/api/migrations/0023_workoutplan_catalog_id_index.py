@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_trainerspecialty'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='workoutplan',
+            name='workout_plans_catalog_idx',
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['is_deleted', 'id'], name='workout_plans_catalog_id_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import models
+from django.db.models import Count, Q
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 
@@ -20,6 +24,12 @@ LOCATION_CHOICES = [
 
 VALID_FOCUS_OPTIONS = ['strength', 'cardio', 'flexibility', 'balance']
 
+TRAINER_SPECIALTIES = ['strength', 'cardio', 'flexibility', 'sports', 'rehabilitation']
+
+DAYS_OF_WEEK = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+WEEKDAY_CHOICES = [(index, day.title()) for index, day in enumerate(DAYS_OF_WEEK)]
+
 DIFFICULTY_RATING_CHOICES = [
     (1, 'Very Easy'),
     (2, 'Easy'),
@@ -33,14 +43,29 @@ DIFFICULTY_RATING_CHOICES = [
 # MODELS
 # ============================================================================
 
+def normalize_email(email):
+    """Canonical stored form of an email address: trimmed and lower-cased."""
+    return (email or '').strip().lower()
+
+
 class CustomUser(AbstractUser):
     """Extended user model for regular users and trainers."""
     is_trainer = models.BooleanField(default=False)
+    # Always stored normalized (see save), so the unique index is case-insensitive
+    # and lookups can use exact matches on it
     email = models.EmailField(unique=True)
 
     class Meta:
         db_table = 'users'
 
+    def clean(self):
+        super().clean()
+        self.email = normalize_email(self.email)
+
+    def save(self, *args, **kwargs):
+        self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
@@ -88,6 +113,33 @@ class TrainerProfile(models.Model):
     
     def __str__(self):
         return f"Trainer Profile: {self.user.username}"
+    
+    @property
+    def specialties(self):
+        """Names of the selected specialty_* flags, in TRAINER_SPECIALTIES order."""
+        return [name for name in TRAINER_SPECIALTIES if getattr(self, f'specialty_{name}')]
+
+
+class TrainerSpecialty(models.Model):
+    """
+    One row per selected specialty of a trainer, mirroring the specialty_* flags.
+    Lets directory filters on any number of specialties run as one indexed lookup.
+    Kept in sync by a post_save signal on TrainerProfile.
+    """
+    trainer = models.ForeignKey(TrainerProfile, on_delete=models.CASCADE, related_name='specialty_tags')
+    specialty = models.CharField(max_length=20)
+
+    class Meta:
+        db_table = 'trainer_specialties'
+        constraints = [
+            models.UniqueConstraint(fields=['trainer', 'specialty'], name='unique_specialty_per_trainer')
+        ]
+        indexes = [
+            models.Index(fields=['specialty', 'trainer']),
+        ]
+
+    def __str__(self):
+        return f"{self.trainer.user.username} - {self.specialty}"
 
 
 class WorkoutPlan(models.Model):
@@ -104,6 +156,10 @@ class WorkoutPlan(models.Model):
     #show/hide in Browse Programs
     is_published = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
+    # Denormalized tree counts so catalog listings never touch nested tables
+    day_count = models.IntegerField(default=0, help_text="Number of non-rest sections")
+    exercise_count = models.IntegerField(default=0, help_text="Number of exercises across all sections")
+    set_count = models.IntegerField(default=0, help_text="Number of sets across all exercises")
     trainer = models.ForeignKey(
         CustomUser, 
         on_delete=models.CASCADE, 
@@ -116,10 +172,68 @@ class WorkoutPlan(models.Model):
 
     class Meta:
         db_table = 'workout_plans'
+        indexes = [
+            # Backs keyset pagination of the program catalog (seeks on id alone)
+            models.Index(fields=['is_deleted', 'id'], name='workout_plans_catalog_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def refresh_tree_counts(self):
+        """Recount day_count/exercise_count/set_count from the stored tree and save them."""
+        counts = ProgramSection.objects.filter(program_id=self.pk).aggregate(
+            day_count=Count('id', filter=Q(is_rest_day=False), distinct=True),
+            exercise_count=Count('exercises', distinct=True),
+            set_count=Count('exercises__sets', distinct=True),
+        )
+        # .update() so counts never bump updated_at or fire the plan's post_save handlers
+        WorkoutPlan.objects.filter(pk=self.pk).update(**counts)
+        for field, value in counts.items():
+            setattr(self, field, value)
+
+
+_tree_counts_managed = ContextVar('tree_counts_managed', default=False)
+
+
+@contextmanager
+def tree_counts_managed():
+    """
+    Mark tree writes whose caller stores the plan's tree counts itself
+    (WorkoutPlanSerializer), so the per-row signal recounts are skipped.
+    """
+    token = _tree_counts_managed.set(True)
+    try:
+        yield
+    finally:
+        _tree_counts_managed.reset(token)
+
+
+def tree_counts_are_managed():
+    return _tree_counts_managed.get()
+
+
+class PlanFocus(models.Model):
+    """
+    One row per focus of a workout plan, mirroring WorkoutPlan.focus.
+    Lets focus matching run as an indexed lookup instead of scanning JSON.
+    Kept in sync by a post_save signal on WorkoutPlan.
+    """
+    plan = models.ForeignKey(WorkoutPlan, on_delete=models.CASCADE, related_name='focus_tags')
+    focus = models.CharField(max_length=20)
+
+    class Meta:
+        db_table = 'plan_focuses'
+        constraints = [
+            models.UniqueConstraint(fields=['plan', 'focus'], name='unique_focus_per_plan')
+        ]
+        indexes = [
+            models.Index(fields=['focus', 'plan']),
+        ]
+
+    def __str__(self):
+        return f"{self.plan.name} - {self.focus}"
+
 
 class ExerciseTemplate(models.Model):
     """
@@ -316,18 +430,29 @@ class UserSchedule(models.Model):
     # Start date for this schedule
     start_date = models.DateField()
     
-    # JSON field mapping: {"monday": [section_id, section_id], "tuesday": [section_id], ...}
-    # Now stores LISTS of section IDs per day to support multiple programs
-    weekly_schedule = models.JSONField(
-        default=dict,
-        help_text="Maps days of week to lists of program section IDs or 'rest'"
-    )
+    # The weekly template lives in ScheduleSlot rows (one per section per day)
     
     is_active = models.BooleanField(
         default=True,
         help_text="Whether this is the user's active schedule"
     )
     
+    # Mirrors user while the schedule is active and is NULL otherwise. Its unique
+    # index enforces one active schedule per user on every backend (MySQL has no
+    # partial unique indexes). Kept in sync by save().
+    active_user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='active_schedule'
+    )
+    
+    # Date range currently materialized into ScheduleOccurrence (null = none)
+    materialized_from = models.DateField(null=True, blank=True)
+    materialized_until = models.DateField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -340,4 +465,109 @@ class UserSchedule(models.Model):
     
     def __str__(self):
         program_names = ', '.join([p.name for p in self.programs.all()[:3]])
-        return f"{self.user.username}'s schedule: {program_names}"
\ No newline at end of file
+        return f"{self.user.username}'s schedule: {program_names}"
+
+    def save(self, *args, **kwargs):
+        self.active_user_id = self.user_id if self.is_active else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_active' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'active_user'}
+        super().save(*args, **kwargs)
+
+    def is_materialized(self, date_from, date_to=None):
+        """Whether every date in [date_from, date_to] has materialized occurrences."""
+        date_to = date_to or date_from
+        return (
+            self.materialized_from is not None
+            and self.materialized_from <= date_from
+            and date_to <= self.materialized_until
+        )
+
+
+class ScheduleSlot(models.Model):
+    """
+    One program section placed on a weekday of a user's weekly schedule.
+    Days without slots are rest days.
+    """
+    schedule = models.ForeignKey(
+        UserSchedule,
+        on_delete=models.CASCADE,
+        related_name='slots'
+    )
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES,
+        help_text="Day of the weekly template (0 = Monday)"
+    )
+    section = models.ForeignKey(
+        ProgramSection,
+        on_delete=models.CASCADE,
+        related_name='schedule_slots'
+    )
+    program = models.ForeignKey(
+        WorkoutPlan,
+        on_delete=models.CASCADE,
+        related_name='schedule_slots'
+    )
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Order of this section within the day"
+    )
+
+    class Meta:
+        db_table = 'schedule_slots'
+        ordering = ['weekday', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'weekday', 'section'], name='unique_section_per_schedule_day')
+        ]
+        indexes = [
+            models.Index(fields=['schedule', 'weekday', 'position']),
+            models.Index(fields=['schedule', 'program']),
+            models.Index(fields=['section', 'weekday']),
+        ]
+
+    def __str__(self):
+        return f"{self.schedule} - {DAYS_OF_WEEK[self.weekday]}: {self.section}"
+
+
+class ScheduleOccurrence(models.Model):
+    """
+    A scheduled section on a concrete date, materialized ahead from ScheduleSlot rows.
+    Turns per-date and per-range schedule lookups into indexed range reads.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='schedule_occurrences'
+    )
+    schedule = models.ForeignKey(
+        UserSchedule,
+        on_delete=models.CASCADE,
+        related_name='occurrences'
+    )
+    date = models.DateField()
+    section = models.ForeignKey(
+        ProgramSection,
+        on_delete=models.CASCADE,
+        related_name='occurrences'
+    )
+    program = models.ForeignKey(
+        WorkoutPlan,
+        on_delete=models.CASCADE,
+        related_name='schedule_occurrences'
+    )
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        db_table = 'schedule_occurrences'
+        ordering = ['date', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'date', 'section'], name='unique_section_per_schedule_date')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['schedule', 'date']),
+            models.Index(fields=['date', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date}: {self.section}"
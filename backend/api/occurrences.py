@@ -0,0 +1,214 @@
+"""
+Materialized schedule occurrences.
+
+Active schedules have their weekly ScheduleSlot rows expanded into dated
+ScheduleOccurrence rows from today up to SCHEDULE_OCCURRENCE_WEEKS ahead.
+UserSchedule.materialized_from/materialized_until record the covered range, so
+a lookup inside it is a plain indexed read and anything outside it falls back
+to expanding the slots. The schedule views keep the rows in step as programs
+are added or removed; the materialize_schedules command rolls the window
+forward each day.
+
+Past occurrences are kept for SCHEDULE_OCCURRENCE_RETENTION_DAYS as a record
+of what was planned and then pruned by the same command, so the table stays
+bounded at roughly retention + horizon days per active user. Lookups older
+than the retained range fall back to expanding the slots.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CustomUser, UserSchedule, ScheduleOccurrence
+
+
+def lock_schedule_owner(user_id):
+    """
+    Lock the user's row FOR UPDATE. Call inside a transaction, before locking any schedule.
+    Every schedule write for a user queues here first, so writers take locks in one order
+    and serialize even when no active schedule exists yet: on InnoDB a locking read that
+    matches nothing only takes gap locks, and two first-time creations would deadlock
+    on their inserts.
+    """
+    CustomUser.objects.select_for_update().only('id').get(pk=user_id)
+
+
+def occurrence_weeks():
+    return getattr(settings, 'SCHEDULE_OCCURRENCE_WEEKS', 0)
+
+
+def horizon(today=None):
+    """Last date that should be materialized, or None when materialization is off."""
+    weeks = occurrence_weeks()
+    if weeks <= 0:
+        return None
+    today = today or timezone.localdate()
+    return today + timedelta(weeks=weeks) - timedelta(days=1)
+
+
+def retention_cutoff(today=None):
+    """First date whose occurrences are kept; older rows are pruned."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=max(getattr(settings, 'SCHEDULE_OCCURRENCE_RETENTION_DAYS', 0), 0))
+
+
+def template_weekday(start_date, event_date):
+    """Weekly slot index for a date; the template's first day falls on start_date."""
+    return (event_date - start_date).days % 7
+
+
+def iter_schedule_days(schedule, date_from, date_to):
+    """Yield (date, weekly slot index) for every date in [date_from, date_to] on or after the start."""
+    event_date = max(date_from, schedule.start_date)
+    while event_date <= date_to:
+        yield event_date, template_weekday(schedule.start_date, event_date)
+        event_date += timedelta(days=1)
+
+
+def iter_slot_dates(schedule, slots, date_from, date_to):
+    """Yield (date, slot) for every slot falling in [date_from, date_to], in slot iteration order per day."""
+    slots_by_weekday = {}
+    for slot in slots:
+        slots_by_weekday.setdefault(slot.weekday, []).append(slot)
+
+    for event_date, weekday in iter_schedule_days(schedule, date_from, date_to):
+        for slot in slots_by_weekday.get(weekday, []):
+            yield event_date, slot
+
+
+def iter_occurrences(schedule, slots, date_from, date_to):
+    """Yield unsaved occurrences of slots for every date in [date_from, date_to] on or after the start."""
+    for event_date, slot in iter_slot_dates(schedule, slots, date_from, date_to):
+        yield ScheduleOccurrence(
+            user_id=schedule.user_id,
+            schedule=schedule,
+            date=event_date,
+            section_id=slot.section_id,
+            program_id=slot.program_id,
+            position=slot.position
+        )
+
+
+def fill(schedule, date_from, date_to, program=None):
+    """Insert occurrences for [date_from, date_to], optionally only for one program's slots."""
+    if date_from > date_to:
+        return
+    slots = schedule.slots.all()
+    if program is not None:
+        slots = slots.filter(program=program)
+    ScheduleOccurrence.objects.bulk_create(
+        iter_occurrences(schedule, list(slots), date_from, date_to),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+def clear_schedule_occurrences(schedule, today=None):
+    """Drop a schedule's occurrences from today on and mark it unmaterialized."""
+    today = today or timezone.localdate()
+    schedule.occurrences.filter(date__gte=today).delete()
+    schedule.materialized_from = None
+    schedule.materialized_until = None
+    schedule.save(update_fields=['materialized_from', 'materialized_until'])
+
+
+def rebuild_schedule_occurrences(schedule, today=None):
+    """Re-materialize a schedule from today to the horizon (after its slots or start date change)."""
+    today = today or timezone.localdate()
+    until = horizon(today)
+    with transaction.atomic():
+        if until is None or not schedule.is_active:
+            clear_schedule_occurrences(schedule, today)
+            return
+        schedule.occurrences.filter(date__gte=today).delete()
+        fill(schedule, today, until)
+        schedule.materialized_from = today
+        schedule.materialized_until = until
+        schedule.save(update_fields=['materialized_from', 'materialized_until'])
+
+
+def add_program_occurrences(schedule, program, today=None):
+    """Materialize a newly added program's slots inside the schedule's covered range."""
+    if schedule.materialized_until is None:
+        rebuild_schedule_occurrences(schedule, today)
+        return
+    today = today or timezone.localdate()
+    fill(schedule, max(today, schedule.materialized_from), schedule.materialized_until, program=program)
+
+
+def remove_program_occurrences(schedule, program, today=None):
+    """Drop a removed program's upcoming occurrences."""
+    today = today or timezone.localdate()
+    schedule.occurrences.filter(program=program, date__gte=today).delete()
+
+
+def extend_schedule_occurrences(schedule, today=None):
+    """
+    Roll a schedule's covered range forward to the horizon, only inserting the new days.
+    Returns the number of days added. Call with the owner locked (lock_schedule_owner)
+    and a freshly read schedule, so the slots cannot change underneath the fill.
+    """
+    today = today or timezone.localdate()
+    until = horizon(today)
+    if until is None:
+        return 0
+    if schedule.materialized_until is None or schedule.materialized_until < today - timedelta(days=1):
+        # Never materialized, or the window lapsed and left a gap
+        rebuild_schedule_occurrences(schedule, today)
+        return (until - today).days + 1
+    if schedule.materialized_until >= until:
+        return 0
+
+    date_from = schedule.materialized_until + timedelta(days=1)
+    with transaction.atomic():
+        fill(schedule, date_from, until)
+        schedule.materialized_until = until
+        schedule.save(update_fields=['materialized_until'])
+    return (until - date_from).days + 1
+
+
+def materialize_active_schedules(today=None):
+    """Extend every active schedule to the horizon. Returns (schedules touched, days added)."""
+    touched = days = 0
+    owners = list(UserSchedule.objects.filter(is_active=True).values_list('id', 'user_id'))
+    for schedule_id, user_id in owners:
+        # Serialize with the schedule views, then re-read: the program may have been removed meanwhile
+        with transaction.atomic():
+            lock_schedule_owner(user_id)
+            schedule = UserSchedule.objects.filter(pk=schedule_id, is_active=True).first()
+            added = extend_schedule_occurrences(schedule, today) if schedule else 0
+        if added:
+            touched += 1
+            days += added
+    return touched, days
+
+
+PRUNE_BATCH_SIZE = 5000
+
+
+def prune_occurrences(today=None):
+    """
+    Delete occurrences dated before the retention cutoff, in primary-key batches,
+    and move materialized_from up so lookups there fall back to the slots.
+    Returns the number of rows deleted.
+    """
+    cutoff = retention_cutoff(today)
+    stale = ScheduleOccurrence.objects.filter(date__lt=cutoff).order_by('pk')
+    deleted = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:PRUNE_BATCH_SIZE])
+        if not ids:
+            break
+        deleted += ScheduleOccurrence.objects.filter(pk__in=ids).delete()[0]
+    UserSchedule.objects.filter(materialized_from__lt=cutoff).update(materialized_from=cutoff)
+    return deleted
+
+
+def users_training_on(date):
+    """Ids of users with at least one workout scheduled on date, from the materialized table."""
+    return (
+        ScheduleOccurrence.objects.filter(date=date, schedule__is_active=True)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProgramCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the program catalog, newest first.
+    Pages seek on the primary key instead of using OFFSET and never run COUNT(*).
+    CursorPagination only seeks on the first ordering field, so this orders by
+    id alone, which follows created_at for plans.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
+
+
+class TrainerCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the trainer directory, newest trainers first.
+    Pages seek on the primary key instead of using OFFSET and never run COUNT(*).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
@@ -0,0 +1,73 @@
+"""
+Cached public profiles.
+
+The viewer-independent part of a public profile (user fields plus both
+profiles) is built from one joined query and kept in the cache under
+profiles:public:<id> for PUBLIC_PROFILE_CACHE_TIMEOUT seconds. Saving or
+deleting the user, their UserProfile or their TrainerProfile drops the entry
+once the change commits (see signals.py); the short TTL bounds staleness from queryset .update()
+calls, which bypass the signals. Owner-only fields such as email are added
+per request by the view and are never cached.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .backends import users_with_profiles
+from .models import UserProfile, TrainerProfile
+from .serializers import TrainerProfileSerializer
+
+PUBLIC_PROFILE_CACHE_TIMEOUT = 60  # seconds
+
+
+def public_profile_cache_key(user_id):
+    return f'profiles:public:{user_id}'
+
+
+def invalidate_public_profile(user_id):
+    cache.delete(public_profile_cache_key(user_id))
+
+
+def build_public_profile(user):
+    """Viewer-independent profile payload for a user loaded with users_with_profiles()."""
+    user_profile = None
+    try:
+        profile = user.profile
+        user_profile = {
+            "age": profile.age,
+            "experience_level": profile.experience_level,
+            "training_location": profile.training_location,
+            "fitness_focus": profile.fitness_focus,
+        }
+    except UserProfile.DoesNotExist:
+        pass
+
+    trainer_profile = None
+    if user.is_trainer:
+        try:
+            trainer_profile = TrainerProfileSerializer(user.trainer_profile).data
+        except TrainerProfile.DoesNotExist:
+            pass
+
+    return {
+        "id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_trainer": user.is_trainer,
+        "user_profile": user_profile,
+        "trainer_profile": trainer_profile,
+    }
+
+
+def get_public_profile_data(user_id):
+    """Return the cached public payload for a user, loading it in one query on a miss; None if no such user."""
+    key = public_profile_cache_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        try:
+            user = users_with_profiles().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        data = build_public_profile(user)
+        cache.set(key, data, PUBLIC_PROFILE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,193 @@
+"""
+Scored ranking of workout plans for a user's profile.
+
+The catalog is held in memory as a handful of compact NumPy arrays (one row per
+non-deleted plan) so a whole candidate set can be scored in a single vectorized
+pass. The arrays are rebuilt when the catalog version stored in Django's cache
+changes (bumped by WorkoutPlan signals) or when they grow older than
+REFRESH_INTERVAL, which also picks up new enrollment counts.
+
+Finished recommendation payloads are cached per user. Each entry records the
+catalog version it was computed against, so a plan change invalidates every
+user's entry at once, and a profile save drops that user's entry.
+"""
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import WorkoutPlan, PlanFocus, EXPERIENCE_CHOICES, VALID_FOCUS_OPTIONS
+
+
+CATALOG_VERSION_KEY = 'recommendations:catalog_version'
+REFRESH_INTERVAL = 600  # seconds
+USER_CACHE_TIMEOUT = 60 * 60  # seconds
+
+EXPERIENCE_LEVELS = [choice[0] for choice in EXPERIENCE_CHOICES]
+FOCUS_INDEX = {focus: index for index, focus in enumerate(VALID_FOCUS_OPTIONS)}
+
+# Preferred minutes per session by training location
+PREFERRED_SESSION_LENGTH = {'home': 30, 'gym': 60}
+SESSION_LENGTH_TOLERANCE = 60
+
+WEIGHTS = {
+    'focus': 0.5,
+    'difficulty': 0.25,
+    'session_length': 0.1,
+    'popularity': 0.15,
+}
+
+
+class RecommendationEngine:
+    """In-memory feature matrix of the plan catalog with vectorized top-k scoring."""
+
+    def __init__(self, plan_ids, focus, difficulty, session_length, enrollments, version=None):
+        self.plan_ids = np.asarray(plan_ids, dtype=np.int64)
+        self.focus = np.asarray(focus, dtype=np.bool_)
+        self.difficulty = np.asarray(difficulty, dtype=np.int8)
+        self.session_length = np.asarray(session_length, dtype=np.int16)
+
+        # Log-scaled enrollments normalized to [0, 1]
+        popularity = np.log1p(np.asarray(enrollments, dtype=np.float32))
+        peak = popularity.max() if popularity.size else 0
+        self.popularity = popularity / peak if peak > 0 else np.zeros_like(popularity)
+
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.plan_ids)
+
+    @classmethod
+    def from_database(cls, version=None):
+        """Build the feature arrays for all non-deleted plans in two queries."""
+        rows = list(
+            WorkoutPlan.objects.filter(is_deleted=False)
+            .annotate(enrollments=Count('user_schedules', filter=Q(user_schedules__is_active=True)))
+            .order_by('id')
+            .values_list('id', 'difficulty', 'session_length', 'enrollments')
+        )
+        plan_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        level_index = {level: index for index, level in enumerate(EXPERIENCE_LEVELS)}
+
+        focus = np.zeros((len(rows), len(VALID_FOCUS_OPTIONS)), dtype=np.bool_)
+        focus_rows = list(PlanFocus.objects.filter(plan__is_deleted=False).values_list('plan_id', 'focus'))
+        if focus_rows and len(plan_ids):
+            focus_plan_ids = np.array([row[0] for row in focus_rows], dtype=np.int64)
+            focus_columns = np.array([FOCUS_INDEX[row[1]] for row in focus_rows], dtype=np.intp)
+            positions = np.minimum(np.searchsorted(plan_ids, focus_plan_ids), len(plan_ids) - 1)
+            known = plan_ids[positions] == focus_plan_ids
+            focus[positions[known], focus_columns[known]] = True
+
+        return cls(
+            plan_ids=plan_ids,
+            focus=focus,
+            difficulty=[level_index.get(row[1], 0) for row in rows],
+            session_length=[row[2] for row in rows],
+            enrollments=[row[3] for row in rows],
+            version=version,
+        )
+
+    def is_stale(self, version):
+        return self.version != version or time.monotonic() - self.built_at > REFRESH_INTERVAL
+
+    def score(self, fitness_focus, experience_level, training_location):
+        """
+        Score every plan in the catalog for a profile.
+        Plans sharing no focus with the profile score -inf.
+        """
+        user_focus = [FOCUS_INDEX[focus] for focus in set(fitness_focus) if focus in FOCUS_INDEX]
+        if not user_focus or not len(self):
+            return np.full(len(self), -np.inf, dtype=np.float32)
+
+        overlap = self.focus[:, user_focus].sum(axis=1, dtype=np.float32)
+        focus_score = overlap / len(user_focus)
+
+        level = EXPERIENCE_LEVELS.index(experience_level) if experience_level in EXPERIENCE_LEVELS else 0
+        difficulty_score = 1 - np.abs(self.difficulty - level) / (len(EXPERIENCE_LEVELS) - 1)
+
+        preferred_length = PREFERRED_SESSION_LENGTH.get(training_location, 45)
+        length_gap = np.abs(self.session_length.astype(np.float32) - preferred_length)
+        session_score = 1 - np.minimum(length_gap / SESSION_LENGTH_TOLERANCE, 1)
+
+        scores = (
+            WEIGHTS['focus'] * focus_score
+            + WEIGHTS['difficulty'] * difficulty_score
+            + WEIGHTS['session_length'] * session_score
+            + WEIGHTS['popularity'] * self.popularity
+        ).astype(np.float32)
+        scores[overlap == 0] = -np.inf
+        return scores
+
+    def rank(self, fitness_focus, experience_level, training_location, k=20):
+        """
+        Return up to k (plan_id, score) pairs, best first.
+        Uses a partial sort so only the top k candidates are ordered.
+        """
+        scores = self.score(fitness_focus, experience_level, training_location)
+        candidates = int(np.count_nonzero(np.isfinite(scores)))
+        k = min(k, candidates)
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Best score first, newest plan first on ties
+        top = top[np.lexsort((-self.plan_ids[top], -scores[top]))]
+        return [(int(self.plan_ids[i]), float(scores[i])) for i in top]
+
+
+_engine = None
+
+
+def get_catalog_version():
+    """Return the current catalog version, creating one if the cache has none."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(CATALOG_VERSION_KEY, version, None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def invalidate_catalog():
+    """Mark every process's in-memory catalog as stale."""
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def get_engine():
+    """Return this process's engine, rebuilding it if the catalog changed."""
+    global _engine
+    version = get_catalog_version()
+    if _engine is None or _engine.is_stale(version):
+        _engine = RecommendationEngine.from_database(version)
+    return _engine
+
+
+def user_cache_key(user_id):
+    return f'recommendations:user:{user_id}'
+
+
+def get_cached_recommendations(user_id, limit):
+    """Return the cached payload for a user and limit, or None if missing or outdated."""
+    key = user_cache_key(user_id)
+    cached = cache.get_many([key, CATALOG_VERSION_KEY])
+    entry = cached.get(key)
+    if entry is None or entry['catalog_version'] != cached.get(CATALOG_VERSION_KEY):
+        return None
+    return entry['payloads'].get(limit)
+
+
+def cache_recommendations(user_id, limit, payload, catalog_version):
+    """Store a payload computed against catalog_version for a user and limit."""
+    key = user_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is None or entry['catalog_version'] != catalog_version:
+        entry = {'catalog_version': catalog_version, 'payloads': {}}
+    entry['payloads'][limit] = payload
+    cache.set(key, entry, USER_CACHE_TIMEOUT)
+
+
+def invalidate_user_recommendations(user_id):
+    """Drop a user's cached recommendations."""
+    cache.delete(user_cache_key(user_id))
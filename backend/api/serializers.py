@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 import re
 
+from .backends import users_with_profiles
 from .models import (
     CustomUser,
     UserProfile,
@@ -17,6 +20,9 @@ from .models import (
     EXPERIENCE_CHOICES,
     LOCATION_CHOICES,
     DIFFICULTY_RATING_CHOICES,
+    DAYS_OF_WEEK,
+    tree_counts_managed,
+    normalize_email,
 )
 
 
@@ -128,6 +134,28 @@ class TrainerProfileSerializer(serializers.ModelSerializer):
         return value
 
 
+class TrainerDirectorySerializer(serializers.ModelSerializer):
+    """
+    Row of the trainer directory.
+    Expects the user joined in and a program_count annotation (see trainer_directory).
+    """
+    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    specialties = serializers.ListField(child=serializers.CharField(), read_only=True)
+    program_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = TrainerProfile
+        fields = [
+            'user_id', 'username', 'first_name', 'last_name',
+            'bio', 'years_of_experience', 'specialties', 'certifications',
+            'program_count'
+        ]
+        read_only_fields = fields
+
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user data with nested profiles."""
@@ -161,21 +189,22 @@ class UserSignupSerializer(serializers.Serializer):
     trainer_data = serializers.JSONField(required=False, allow_null=True)
 
 
+    DUPLICATE_ERRORS = {
+        'username': "Username already taken",
+        'email': "Email already in use",
+    }
+
+
     def validate_username(self, value):
-        """Validate username is unique and within length limits."""
+        """Validate username length (uniqueness is enforced on insert)."""
         if len(value) > 16:
             raise serializers.ValidationError("Username must be 16 characters or less")
-        if CustomUser.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username already taken")
         return value
 
 
     def validate_email(self, value):
-        """Validate email is unique (case-insensitive)."""
-        normalized_email = value.strip().lower()
-        if CustomUser.objects.filter(email__iexact=normalized_email).exists():
-            raise serializers.ValidationError("Email already in use")
-        return normalized_email
+        """Normalize email (uniqueness is enforced on insert)."""
+        return normalize_email(value)
 
 
     def validate_password(self, value):
@@ -220,7 +249,35 @@ class UserSignupSerializer(serializers.Serializer):
 
 
     def create(self, validated_data):
-        """Create user with profile and optional trainer profile."""
+        """
+        Create user with profile and optional trainer profile in one transaction.
+        Duplicate usernames and emails are caught by the unique indexes rather
+        than pre-checked, and reported as the usual field errors.
+        """
+        try:
+            with transaction.atomic():
+                return self.create_user_with_profiles(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(self.duplicate_errors(validated_data))
+
+
+    def duplicate_errors(self, validated_data):
+        """
+        Field errors for whichever of username and email is already taken.
+        Usernames compare case-insensitively, like the MySQL unique index.
+        """
+        username, email = validated_data["username"], validated_data["email"]
+        taken = CustomUser.objects.filter(Q(username__iexact=username) | Q(email=email)).values_list('username', 'email')
+        errors = {}
+        for taken_username, taken_email in taken:
+            if taken_username.casefold() == username.casefold():
+                errors['username'] = [self.DUPLICATE_ERRORS['username']]
+            if taken_email == email:
+                errors['email'] = [self.DUPLICATE_ERRORS['email']]
+        return errors or {'detail': ["Could not create account, please try again"]}
+
+
+    def create_user_with_profiles(self, validated_data):
         # Remove password confirmation
         validated_data.pop('password2', None)
         
@@ -258,7 +315,9 @@ class UserSignupSerializer(serializers.Serializer):
             else:
                 # Create empty trainer profile
                 TrainerProfile.objects.create(user=user)
-
+        else:
+            # Record the missing trainer profile so serializing the user doesn't query for it
+            CustomUser.trainer_profile.related.set_cached_value(user, None)
 
         return user
 
@@ -280,16 +339,17 @@ class UserLoginSerializer(serializers.Serializer):
         # Check if login is email or username
         if '@' in login:
             try:
-                user = CustomUser.objects.get(email__iexact=login.strip().lower())
+                user = users_with_profiles().get(email=normalize_email(login))
             except CustomUser.DoesNotExist:
                 raise serializers.ValidationError("Invalid credentials")
         else:
             try:
-                user = CustomUser.objects.get(username=login)
+                user = users_with_profiles().get(username=login)
             except CustomUser.DoesNotExist:
                 raise serializers.ValidationError("Invalid credentials")
         
-        # Verify password
+        # Verify password. On success check_password() also re-hashes and saves
+        # a password stored with an outdated hasher or cost (see api.hashers).
         if not user.check_password(password):
             raise serializers.ValidationError("Invalid credentials")
         
@@ -334,31 +394,90 @@ class ExerciseTemplateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("exercise_type must be 'reps' or 'time'")
         return value
 
+def bulk_create_with_pks(model, objs, key_fields, **filters):
+    """
+    bulk_create objs and make sure each one has its primary key set.
+    Backends that cannot return ids from a bulk INSERT (MySQL) get them back
+    with one extra query, matching rows on key_fields within filters.
+    """
+    created = model.objects.bulk_create(objs)
+    if all(obj.pk is not None for obj in created):
+        return created
+
+    pks = {
+        tuple(row[field] for field in key_fields): row['pk']
+        for row in model.objects.filter(**filters).values('pk', *key_fields)
+    }
+    for obj in created:
+        obj.pk = pks[tuple(getattr(obj, field) for field in key_fields)]
+    return created
+
+
+def match_by_id_or_position(existing, incoming):
+    """
+    Pair incoming nested data with existing rows of the same parent.
+    An item claims the row whose id it carries; otherwise it takes the row at
+    its own position if that row is still free. Returns (row or None, data)
+    pairs in incoming order, plus the rows nobody claimed.
+    """
+    by_id = {row.id: row for row in existing}
+    claimed = {}
+    for index, data in enumerate(incoming):
+        row = by_id.get(data.get('id'))
+        if row is not None and row.id not in claimed.values():
+            claimed[index] = row.id
+
+    taken = set(claimed.values())
+    pairs = []
+    for index, data in enumerate(incoming):
+        if index in claimed:
+            pairs.append((by_id[claimed[index]], data))
+        elif index < len(existing) and existing[index].id not in taken:
+            taken.add(existing[index].id)
+            pairs.append((existing[index], data))
+        else:
+            pairs.append((None, data))
+
+    leftovers = [row for row in existing if row.id not in taken]
+    return pairs, leftovers
+
+
+def assign_changed(obj, values):
+    """Set values on obj and return the names of fields that actually changed."""
+    changed = []
+    for field, value in values.items():
+        if getattr(obj, field) != value:
+            setattr(obj, field, value)
+            changed.append(field)
+    return changed
+
+
 class ExerciseSetSerializer(serializers.ModelSerializer):
     """Serializer for exercise sets."""
+    # Writable so nested updates can match existing rows
+    id = serializers.IntegerField(required=False)
     
     class Meta:
         model = ExerciseSet
         fields = ['id', 'set_number', 'reps', 'time', 'rest']
-        read_only_fields = ['id']
 
 class ExerciseSerializer(serializers.ModelSerializer):
     """Serializer for exercises with nested sets."""
+    id = serializers.IntegerField(required=False)
     sets = ExerciseSetSerializer(many=True)
     
     class Meta:
         model = Exercise
         fields = ['id', 'name', 'sets', 'order']
-        read_only_fields = ['id']
 
 class ProgramSectionSerializer(serializers.ModelSerializer):
     """Serializer for program sections with nested exercises."""
+    id = serializers.IntegerField(required=False)
     exercises = ExerciseSerializer(many=True)
     
     class Meta:
         model = ProgramSection
         fields = ['id', 'format', 'type', 'is_rest_day', 'exercises', 'order']
-        read_only_fields = ['id']
 
 class WorkoutPlanSerializer(serializers.ModelSerializer):
     """Serializer for workout plans with trainer information and nested sections."""
@@ -402,46 +521,173 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         return value
 
 
-    def create(self, validated_data):
-        """Create workout plan with nested sections, exercises, and sets."""
-        sections_data = validated_data.pop('sections', [])
-
-
-        # Create the workout plan
-        plan = WorkoutPlan.objects.create(**validated_data)
-
-
-        # Create sections with exercises and sets
-        for section_order, section_data in enumerate(sections_data):
-            exercises_data = section_data.pop('exercises', [])
-            section = ProgramSection.objects.create(
-                program=plan,
-                format=section_data.get('format', ''),
-                type=section_data.get('type', ''),
-                order=section_order
+    @staticmethod
+    def get_tree_counts(sections_data):
+        """Count workout days, exercises and sets in incoming nested section data."""
+        day_count = exercise_count = set_count = 0
+        for section_data in sections_data:
+            if not section_data.get('is_rest_day', False):
+                day_count += 1
+            exercises_data = section_data.get('exercises', [])
+            exercise_count += len(exercises_data)
+            set_count += sum(len(exercise_data.get('sets', [])) for exercise_data in exercises_data)
+        return {
+            'day_count': day_count,
+            'exercise_count': exercise_count,
+            'set_count': set_count,
+        }
+
+
+    @staticmethod
+    def section_values(section_data, order):
+        return {
+            'format': section_data.get('format', ''),
+            'type': section_data.get('type', ''),
+            'is_rest_day': section_data.get('is_rest_day', False),
+            'order': order,
+        }
+
+
+    @staticmethod
+    def exercise_values(exercise_data, order):
+        return {
+            'name': exercise_data.get('name', ''),
+            'order': order,
+        }
+
+
+    @staticmethod
+    def set_values(set_data):
+        return {
+            'set_number': set_data.get('set_number'),
+            'reps': set_data.get('reps'),
+            'time': set_data.get('time'),
+            'rest': set_data.get('rest', 0),
+        }
+
+
+    def insert_tree(self, plan, new_sections=(), new_exercises=(), new_sets=()):
+        """
+        Bulk insert new nodes of a plan's tree with one INSERT per level.
+
+        new_sections are (ProgramSection, exercises_data) pairs, new_exercises are
+        (Exercise, sets_data) pairs and new_sets are ExerciseSet instances. Children
+        of new sections and exercises are built and inserted along with them.
+        """
+        new_exercises = list(new_exercises)
+        new_sets = list(new_sets)
+
+        sections = bulk_create_with_pks(
+            ProgramSection,
+            [section for section, _ in new_sections],
+            key_fields=('order',),
+            program=plan,
+        )
+        for section, (_, exercises_data) in zip(sections, new_sections):
+            for exercise_order, exercise_data in enumerate(exercises_data):
+                new_exercises.append((
+                    Exercise(section=section, **self.exercise_values(exercise_data, exercise_order)),
+                    exercise_data.get('sets', [])
+                ))
+
+        exercises = bulk_create_with_pks(
+            Exercise,
+            [exercise for exercise, _ in new_exercises],
+            key_fields=('section_id', 'order'),
+            section__in={exercise.section_id for exercise, _ in new_exercises},
+        )
+        for exercise, (_, sets_data) in zip(exercises, new_exercises):
+            new_sets.extend(
+                ExerciseSet(exercise=exercise, **self.set_values(set_data))
+                for set_data in sets_data
             )
 
-
-            # Create exercises for this section
-            for exercise_order, exercise_data in enumerate(exercises_data):
-                sets_data = exercise_data.pop('sets', [])
-                exercise = Exercise.objects.create(
-                    section=section,
-                    name=exercise_data.get('name', ''),
-                    order=exercise_order
-                )
+        ExerciseSet.objects.bulk_create(new_sets)
+
+
+    def create_section_tree(self, plan, sections_data):
+        """Insert a complete sections -> exercises -> sets tree for a new plan."""
+        self.insert_tree(plan, new_sections=[
+            (ProgramSection(program=plan, **self.section_values(section_data, section_order)),
+             section_data.get('exercises', []))
+            for section_order, section_data in enumerate(sections_data)
+        ])
+
+
+    def reconcile_section_tree(self, plan, sections_data):
+        """
+        Bring a plan's existing tree in line with incoming nested data.
+
+        Sections, exercises and sets are matched by id or position, so unchanged
+        rows keep their ids (schedules reference section ids). Only the deletes,
+        bulk_updates and inserts that are actually needed are issued.
+        """
+        existing_sections = list(plan.sections.order_by('order').prefetch_related('exercises__sets'))
+
+        deleted = {ProgramSection: [], Exercise: [], ExerciseSet: []}
+        updated = {ProgramSection: (set(), []), Exercise: (set(), []), ExerciseSet: (set(), [])}
+        new_sections, new_exercises, new_sets = [], [], []
+
+        def track_update(obj, values):
+            changed = assign_changed(obj, values)
+            if changed:
+                fields, objs = updated[type(obj)]
+                fields.update(changed)
+                objs.append(obj)
+
+        section_pairs, leftover_sections = match_by_id_or_position(existing_sections, sections_data)
+        deleted[ProgramSection].extend(leftover_sections)
+
+        for section_order, (section, section_data) in enumerate(section_pairs):
+            exercises_data = section_data.get('exercises', [])
+            if section is None:
+                new_sections.append((
+                    ProgramSection(program=plan, **self.section_values(section_data, section_order)),
+                    exercises_data
+                ))
+                continue
+            track_update(section, self.section_values(section_data, section_order))
+
+            exercise_pairs, leftover_exercises = match_by_id_or_position(list(section.exercises.all()), exercises_data)
+            deleted[Exercise].extend(leftover_exercises)
+
+            for exercise_order, (exercise, exercise_data) in enumerate(exercise_pairs):
+                sets_data = exercise_data.get('sets', [])
+                if exercise is None:
+                    new_exercises.append((
+                        Exercise(section=section, **self.exercise_values(exercise_data, exercise_order)),
+                        sets_data
+                    ))
+                    continue
+                track_update(exercise, self.exercise_values(exercise_data, exercise_order))
+
+                set_pairs, leftover_sets = match_by_id_or_position(list(exercise.sets.all()), sets_data)
+                deleted[ExerciseSet].extend(leftover_sets)
+
+                for exercise_set, set_data in set_pairs:
+                    if exercise_set is None:
+                        new_sets.append(ExerciseSet(exercise=exercise, **self.set_values(set_data)))
+                    else:
+                        track_update(exercise_set, self.set_values(set_data))
+
+        # Deletes and updates go first so positional keys are unique for inserts
+        for model, rows in deleted.items():
+            if rows:
+                model.objects.filter(id__in=[row.id for row in rows]).delete()
+        for model, (fields, objs) in updated.items():
+            if objs:
+                model.objects.bulk_update(objs, sorted(fields))
+
+        self.insert_tree(plan, new_sections, new_exercises, new_sets)
 
 
-                # Create sets for this exercise
-                for set_data in sets_data:
-                    ExerciseSet.objects.create(
-                        exercise=exercise,
-                        set_number=set_data.get('set_number'),
-                        reps=set_data.get('reps'),
-                        time=set_data.get('time'),
-                        rest=set_data.get('rest', 0)
-                    )
+    def create(self, validated_data):
+        """Create workout plan with nested sections, exercises, and sets."""
+        sections_data = validated_data.pop('sections', [])
 
+        with transaction.atomic(), tree_counts_managed():
+            plan = WorkoutPlan.objects.create(**validated_data, **self.get_tree_counts(sections_data))
+            self.create_section_tree(plan, sections_data)
 
         return plan
 
@@ -455,47 +701,47 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         instance.difficulty = validated_data.get('difficulty', instance.difficulty)
         instance.weekly_frequency = validated_data.get('weekly_frequency', instance.weekly_frequency)
         instance.session_length = validated_data.get('session_length', instance.session_length)
-        instance.save()
-        
-        # If sections data provided, update sections
         if sections_data is not None:
-            # Delete existing sections (cascade will delete exercises and sets)
-            instance.sections.all().delete()
-            
-            # Create new sections with exercises and sets
-            for section_order, section_data in enumerate(sections_data):
-                exercises_data = section_data.pop('exercises', [])
-                section = ProgramSection.objects.create(
-                    program=instance,
-                    format=section_data.get('format', ''),
-                    type=section_data.get('type', ''),
-                    is_rest_day=section_data.get('is_rest_day', False),
-                    order=section_order
-                )
-                
-                # Create exercises for this section
-                for exercise_order, exercise_data in enumerate(exercises_data):
-                    sets_data = exercise_data.pop('sets', [])
-                    exercise = Exercise.objects.create(
-                        section=section,
-                        name=exercise_data.get('name', ''),
-                        order=exercise_order
-                    )
-                    
-                    # Create sets for this exercise
-                    for set_data in sets_data:
-                        ExerciseSet.objects.create(
-                            exercise=exercise,
-                            set_number=set_data.get('set_number'),
-                            reps=set_data.get('reps'),
-                            time=set_data.get('time'),
-                            rest=set_data.get('rest', 0)
-                        )
+            for field, value in self.get_tree_counts(sections_data).items():
+                setattr(instance, field, value)
+
+        with transaction.atomic(), tree_counts_managed():
+            instance.save()
+
+            # If sections data provided, reconcile the nested tree in place
+            if sections_data is not None:
+                self.reconcile_section_tree(instance, sections_data)
     
         return instance
 
 
 
+class WorkoutPlanSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight catalog serializer for workout plans.
+    Uses the denormalized tree counts instead of nested sections.
+    """
+    trainer_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutPlan
+        fields = [
+            'id', 'name', 'description', 'focus', 'difficulty',
+            'weekly_frequency', 'session_length',
+            'trainer', 'trainer_name', 'created_at',
+            'day_count', 'exercise_count', 'set_count'
+        ]
+        read_only_fields = fields
+
+
+    def get_trainer_name(self, obj):
+        """Return trainer's full name or default."""
+        if obj.trainer:
+            return f"{obj.trainer.first_name} {obj.trainer.last_name}"
+        return "System Default"
+
+
+
 class WorkoutSessionSerializer(serializers.ModelSerializer):
     """Serializer for workout sessions."""
     plan_name = serializers.CharField(source='plan.name', read_only=True)
@@ -534,6 +780,7 @@ class UserScheduleSerializer(serializers.ModelSerializer):
     """Serializer for user's workout schedule with multiple programs."""
     program_names = serializers.SerializerMethodField()
     program_list = serializers.SerializerMethodField()
+    weekly_schedule = serializers.SerializerMethodField()
     
     class Meta:
         model = UserSchedule
@@ -558,16 +805,9 @@ class UserScheduleSerializer(serializers.ModelSerializer):
             'trainer_name': f"{p.trainer.first_name} {p.trainer.last_name}" if p.trainer else "System"
         } for p in obj.programs.all()]
     
-    def validate_weekly_schedule(self, value):
-        """Validate weekly schedule structure."""
-        valid_days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        
-        if not isinstance(value, dict):
-            raise serializers.ValidationError("weekly_schedule must be a dictionary")
-        
-        for day in value.keys():
-            if day.lower() not in valid_days:
-                raise serializers.ValidationError(f"Invalid day: {day}")
-        
-        return value
-       
\ No newline at end of file
+    def get_weekly_schedule(self, obj):
+        """Return {day: [section_id, ...]} built from the schedule's slots."""
+        weekly_schedule = {day: [] for day in DAYS_OF_WEEK}
+        for slot in sorted(obj.slots.all(), key=lambda slot: (slot.weekday, slot.position)):
+            weekly_schedule[DAYS_OF_WEEK[slot.weekday]].append(slot.section_id)
+        return weekly_schedule
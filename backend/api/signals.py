@@ -0,0 +1,180 @@
+from functools import partial
+from threading import local
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import invalidate_cached_user
+from .models import (
+    CustomUser, WorkoutPlan, PlanFocus, ProgramSection, Exercise, ExerciseSet, UserProfile, TrainerProfile, TrainerSpecialty,
+    VALID_FOCUS_OPTIONS, TRAINER_SPECIALTIES, tree_counts_are_managed,
+)
+from .profiles import invalidate_public_profile
+from .recommendations import invalidate_catalog, invalidate_user_recommendations
+
+
+@receiver(post_save, sender=WorkoutPlan)
+def sync_plan_focus(sender, instance, update_fields=None, **kwargs):
+    """Mirror WorkoutPlan.focus into PlanFocus rows."""
+    if update_fields is not None and 'focus' not in update_fields:
+        return
+
+    focuses = {focus for focus in (instance.focus or []) if focus in VALID_FOCUS_OPTIONS}
+    existing = set(instance.focus_tags.values_list('focus', flat=True))
+
+    stale = existing - focuses
+    if stale:
+        instance.focus_tags.filter(focus__in=stale).delete()
+
+    missing = focuses - existing
+    if missing:
+        PlanFocus.objects.bulk_create([PlanFocus(plan=instance, focus=focus) for focus in sorted(missing)])
+
+
+SPECIALTY_FIELDS = {f'specialty_{name}' for name in TRAINER_SPECIALTIES}
+
+
+@receiver(post_save, sender=TrainerProfile)
+def sync_trainer_specialties(sender, instance, update_fields=None, **kwargs):
+    """Mirror the TrainerProfile.specialty_* flags into TrainerSpecialty rows."""
+    if update_fields is not None and not SPECIALTY_FIELDS.intersection(update_fields):
+        return
+
+    specialties = set(instance.specialties)
+    existing = set(instance.specialty_tags.values_list('specialty', flat=True))
+
+    stale = existing - specialties
+    if stale:
+        instance.specialty_tags.filter(specialty__in=stale).delete()
+
+    missing = specialties - existing
+    if missing:
+        TrainerSpecialty.objects.bulk_create(
+            [TrainerSpecialty(trainer=instance, specialty=specialty) for specialty in sorted(missing)]
+        )
+
+
+class PendingTreeCounts:
+    """
+    Parents of the section, exercise and set rows written in one transaction.
+    Flushed once on commit, so a tree built row by row costs one recount per
+    plan instead of one per row.
+    """
+
+    def __init__(self):
+        self.plan_ids = set()
+        self.section_ids = set()
+        self.exercise_ids = set()
+        self.flushed = False
+
+    def add(self, sender, instance):
+        if sender is ProgramSection:
+            self.plan_ids.add(instance.program_id)
+        elif sender is Exercise:
+            self.section_ids.add(instance.section_id)
+        else:
+            self.exercise_ids.add(instance.exercise_id)
+
+    def flush(self):
+        self.flushed = True
+        plans = WorkoutPlan.objects.filter(
+            Q(pk__in=self.plan_ids)
+            | Q(sections__in=self.section_ids)
+            | Q(sections__exercises__in=self.exercise_ids)
+        ).distinct().only('id')
+        for plan in plans:
+            plan.refresh_tree_counts()
+
+
+_pending_tree_counts = local()
+
+
+def pending_tree_counts(using):
+    """
+    The batch queued for the current transaction on `using`, queueing a new one
+    if the last one already ran or was discarded by a rollback.
+    """
+    batches = _pending_tree_counts.__dict__.setdefault('batches', {})
+    batch = batches.get(using)
+    queued = transaction.get_connection(using).run_on_commit
+    if batch is None or batch.flushed or not any(func == batch.flush for _, func, _ in queued):
+        batch = batches[using] = PendingTreeCounts()
+        transaction.on_commit(batch.flush, using=using)
+    return batch
+
+
+@receiver(post_save, sender=ProgramSection)
+@receiver(post_save, sender=Exercise)
+@receiver(post_save, sender=ExerciseSet)
+@receiver(post_delete, sender=ProgramSection)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=ExerciseSet)
+def refresh_plan_tree_counts(sender, instance, raw=False, origin=None, using=None, **kwargs):
+    """Keep WorkoutPlan tree counts right for per-row ORM writes outside WorkoutPlanSerializer."""
+    if raw or tree_counts_are_managed():
+        return
+    # Rows removed by a cascade are recounted once, by the row the delete started from
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not sender:
+        return
+    if not transaction.get_connection(using).in_atomic_block:
+        batch = PendingTreeCounts()
+        batch.add(sender, instance)
+        batch.flush()
+        return
+    pending_tree_counts(using).add(sender, instance)
+
+
+@receiver(post_save, sender=WorkoutPlan)
+@receiver(post_delete, sender=WorkoutPlan)
+def invalidate_recommendation_catalog(sender, **kwargs):
+    """
+    Rebuild the in-memory recommendation catalog after any plan change.
+    Deferred to commit so no request can rebuild it under the new version
+    while the plan and its tree are still uncommitted.
+    """
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_recommendations(sender, instance, **kwargs):
+    """Recompute a user's recommendations once their profile change is committed."""
+    transaction.on_commit(partial(invalidate_user_recommendations, instance.user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Drop a user's cached copy so session requests see the change. Deferred to
+    commit so a concurrent request cannot re-cache the old row for the full TTL.
+    """
+    transaction.on_commit(partial(invalidate_cached_user, instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=TrainerProfile)
+@receiver(post_delete, sender=TrainerProfile)
+def invalidate_profile_user_cache(sender, instance, **kwargs):
+    """Cached users carry both profiles, so profile changes drop the owner's entry too, on commit."""
+    transaction.on_commit(partial(invalidate_cached_user, instance.user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_public_profile(sender, instance, **kwargs):
+    """Drop the cached public profile once a change to the user's own fields commits."""
+    transaction.on_commit(partial(invalidate_public_profile, instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=TrainerProfile)
+@receiver(post_delete, sender=TrainerProfile)
+def invalidate_profile_public_profile(sender, instance, **kwargs):
+    """Public profiles embed both profiles, so profile changes drop the owner's entry too, on commit."""
+    transaction.on_commit(partial(invalidate_public_profile, instance.user_id))
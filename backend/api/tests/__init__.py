@@ -2,13 +2,18 @@ from .test_authentication import (
     UserSignupTests,
     UserLoginTests,
     UserLogoutTests,
-    CurrentUserTests
+    CurrentUserTests,
+    TokenAuthenticationTests,
+    CachedSessionAuthenticationTests,
+    UserLoadingQueryTests,
+    LoginThrottleTests,
+    PasswordRehashTests
 )
-from .test_profiles import UserProfileTests
+from .test_profiles import UserProfileTests, TrainerDirectoryTests, PublicProfileTests
 from .test_exercise_templates import ExerciseTemplateTests
-from .test_workout_programs import WorkoutProgramTests
+from .test_workout_programs import WorkoutProgramTests, WorkoutProgramQueryBudgetTests
 from .test_recommendations import RecommendationsTests
-from .test_schedules import ScheduleTests
+from .test_schedules import ScheduleTests, ScheduleOccurrenceTests, ScheduleConcurrencyTests
 from .test_workout_sessions import WorkoutSessionTests
 
 __all__ = [
@@ -16,10 +21,20 @@ __all__ = [
     'UserLoginTests',
     'UserLogoutTests',
     'CurrentUserTests',
+    'TokenAuthenticationTests',
+    'CachedSessionAuthenticationTests',
+    'UserLoadingQueryTests',
+    'LoginThrottleTests',
+    'PasswordRehashTests',
     'UserProfileTests',
+    'TrainerDirectoryTests',
+    'PublicProfileTests',
     'ExerciseTemplateTests',
     'WorkoutProgramTests',
+    'WorkoutProgramQueryBudgetTests',
     'RecommendationsTests',
     'ScheduleTests',
+    'ScheduleOccurrenceTests',
+    'ScheduleConcurrencyTests',
     'WorkoutSessionTests',
 ]
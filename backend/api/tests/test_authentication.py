@@ -1,8 +1,19 @@
-from django.test import TestCase
+import jwt
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2SHA1PasswordHasher, identify_hasher
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from unittest.mock import patch
+from api.hashers import ConfigurablePBKDF2PasswordHasher
 from api.models import CustomUser, UserProfile, TrainerProfile
+from api.serializers import UserSignupSerializer
+from api.throttling import CacheBucketStore, LocalMemoryBucketStore, reset_login_throttle
 
 # AUTHENTICATION TEST CASES
 
@@ -96,6 +107,62 @@ class UserSignupTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('errors', response.data)
     
+    def test_email_stored_normalized(self):
+        """Test that emails are stored lower-cased and case variants count as duplicates"""
+        data = {
+            'username': 'testuser',
+            'email': '  Test@Example.COM ',
+            'password': 'SecurePass123!',
+            'password2': 'SecurePass123!',
+            'first_name': 'Test',
+            'last_name': 'User'
+        }
+        
+        response = self.client.post(self.signup_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CustomUser.objects.get(username='testuser').email, 'test@example.com')
+        
+        data.update(username='otheruser', email='TEST@example.com')
+        response = self.client.post(self.signup_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data['errors'])
+        
+        user = CustomUser.objects.create_user(username='direct', email='Direct@Example.com', password='Pass123!')
+        self.assertEqual(user.email, 'direct@example.com')
+    
+    def test_duplicate_signup_maps_integrity_error_to_field_errors(self):
+        """Test that unique-index violations come back as the usual field errors and leave nothing behind"""
+        CustomUser.objects.create_user(username='taken', email='taken@example.com', password='Pass123!')
+        data = {
+            'username': 'taken',
+            'email': 'Taken@Example.com',
+            'password': 'SecurePass123!',
+            'password2': 'SecurePass123!',
+            'first_name': 'New',
+            'last_name': 'User',
+            'is_trainer': True,
+            'trainer_data': {'specialty_strength': True}
+        }
+        
+        response = self.client.post(self.signup_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], {
+            'username': "Username already taken",
+            'email': "Email already in use",
+        })
+        self.assertEqual(CustomUser.objects.count(), 1)
+        self.assertFalse(TrainerProfile.objects.exists())
+    
+    def test_duplicate_errors_match_username_case_insensitively(self):
+        """Test that a username differing only in case is reported as taken, as the MySQL index rejects it"""
+        CustomUser.objects.create_user(username='alice', email='alice@example.com', password='Pass123!')
+        
+        errors = UserSignupSerializer().duplicate_errors({'username': 'Alice', 'email': 'other@example.com'})
+        
+        self.assertEqual(errors, {'username': [UserSignupSerializer.DUPLICATE_ERRORS['username']]})
+    
     def test_duplicate_username_signup_fails(self):
         """Test that signing up with an existing username fails"""
         CustomUser.objects.create_user(
@@ -170,6 +237,7 @@ class UserLoginTests(TestCase):
         """Set up test client and create a test user"""
         self.client = APIClient()
         self.login_url = reverse('login')
+        reset_login_throttle()
         
         self.user = CustomUser.objects.create_user(
             username='testuser',
@@ -206,6 +274,16 @@ class UserLoginTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data['ok'])
     
+    def test_login_email_is_case_insensitive_exact_lookup(self):
+        """Test that email login ignores case and uses an exact indexed match"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.login_url, {'login': ' TEST@example.com', 'password': 'TestPass123!'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user_lookup = queries[0]['sql']
+        self.assertIn('"users"."email" = ', user_lookup)
+        self.assertNotIn('LIKE', user_lookup)
+    
     def test_login_with_invalid_credentials(self):
         """Test that login fails with incorrect password"""
         data = {
@@ -311,3 +389,482 @@ class CurrentUserTests(TestCase):
         response = unauth_client.get(self.me_url)
         
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_sessions_from_legacy_backends_resolve(self):
+        """Test that sessions recorded under a legacy backend stay logged in and move to the current one"""
+        for backend in settings.LEGACY_AUTHENTICATION_BACKENDS:
+            client = APIClient()
+            client.force_login(self.user, backend=backend)
+            
+            response = client.get(self.me_url)
+            
+            self.assertEqual(response.status_code, status.HTTP_200_OK, backend)
+            self.assertEqual(response.data['user']['username'], 'testuser')
+            self.assertEqual(client.session['_auth_user_backend'], settings.AUTHENTICATION_BACKENDS[0])
+    
+    def test_failed_authenticate_hashes_once(self):
+        """Test that a bad password is checked by one backend only"""
+        with patch('django.contrib.auth.backends.ModelBackend.authenticate', autospec=True, return_value=None) as backend:
+            self.assertIsNone(authenticate(username='testuser', password='wrong'))
+        
+        self.assertEqual(backend.call_count, 1)
+    
+    def test_login_records_preferred_backend(self):
+        """Test that new sessions are recorded under the first configured backend"""
+        reset_login_throttle()
+        client = APIClient()
+        
+        client.post(reverse('login'), {'login': 'testuser', 'password': 'TestPass123!'}, format='json')
+        
+        self.assertEqual(client.session['_auth_user_backend'], settings.AUTHENTICATION_BACKENDS[0])
+
+
+class TokenAuthenticationTests(TestCase):
+    """Test suite for stateless token authentication"""
+    
+    def setUp(self):
+        """Set up test client and create a trainer"""
+        self.client = APIClient()
+        self.token_url = reverse('token_obtain')
+        reset_login_throttle()
+        self.refresh_url = reverse('token_refresh')
+        self.me_url = reverse('me')
+        
+        self.user = CustomUser.objects.create_user(
+            username='trainer',
+            email='trainer@example.com',
+            password='TestPass123!',
+            is_trainer=True
+        )
+        UserProfile.objects.create(user=self.user)
+    
+    def obtain_tokens(self):
+        response = self.client.post(self.token_url, {'login': 'trainer', 'password': 'TestPass123!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_obtain_and_use_access_token(self):
+        """Test that a bearer token authenticates without a session"""
+        tokens = self.obtain_tokens()
+        claims = jwt.decode(tokens['access'], settings.JWT_SIGNING_KEY, algorithms=[settings.JWT_ALGORITHM])
+        self.assertEqual(claims['user_id'], self.user.id)
+        self.assertTrue(claims['is_trainer'])
+        self.assertNotIn('sessionid', self.client.cookies)
+        
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.me_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Authenticated from the token and a user read; the session table is never touched
+        self.assertIn('"users"', queries[0]['sql'])
+        self.assertFalse(any('django_session' in query['sql'] for query in queries))
+        self.assertEqual(response.data['user']['username'], 'trainer')
+    
+    def test_obtain_with_invalid_credentials(self):
+        """Test that bad credentials get no tokens"""
+        response = self.client.post(self.token_url, {'login': 'trainer', 'password': 'wrong'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn('access', response.data)
+    
+    def test_refresh_token(self):
+        """Test that a refresh token yields a new pair and an access token cannot be used to refresh"""
+        tokens = self.obtain_tokens()
+        
+        response = self.client.post(self.refresh_url, {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
+        
+        response = self.client.post(self.refresh_url, {'refresh': tokens['access']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        response = self.client.post(self.refresh_url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_rejected_tokens(self):
+        """Test that expired, tampered and refresh tokens are not accepted as access tokens"""
+        with override_settings(JWT_ACCESS_TOKEN_LIFETIME=-1):
+            expired = self.obtain_tokens()['access']
+        tokens = self.obtain_tokens()
+        
+        for token in [expired, tokens['access'] + 'x', tokens['refresh']]:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            response = client.get(self.me_url)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_inactive_user_token_rejected(self):
+        """Test that tokens stop working once the user is deactivated"""
+        tokens = self.obtain_tokens()
+        self.user.is_active = False
+        self.user.save()
+        
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(client.get(self.me_url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        response = self.client.post(self.refresh_url, {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    
+    def test_password_change_revokes_tokens(self):
+        """Test that access and refresh tokens stop working once the password changes"""
+        tokens = self.obtain_tokens()
+        self.user.set_password('NewPass456!')
+        self.user.save()
+        
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(client.get(self.me_url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        response = self.client.post(self.refresh_url, {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_refresh_never_extends_past_max_lifetime(self):
+        """Test that refreshed tokens keep the original login time and expire with it"""
+        with override_settings(JWT_REFRESH_TOKEN_MAX_LIFETIME=60):
+            tokens = self.obtain_tokens()
+            first = jwt.decode(tokens['refresh'], settings.JWT_SIGNING_KEY, algorithms=[settings.JWT_ALGORITHM])
+            response = self.client.post(self.refresh_url, {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second = jwt.decode(response.data['refresh'], settings.JWT_SIGNING_KEY, algorithms=[settings.JWT_ALGORITHM])
+        
+        self.assertEqual(second['auth_time'], first['auth_time'])
+        self.assertLessEqual(second['exp'], first['auth_time'] + 60)
+        
+        with override_settings(JWT_REFRESH_TOKEN_MAX_LIFETIME=-1):
+            expired = self.obtain_tokens()['refresh']
+        response = self.client.post(self.refresh_url, {'refresh': expired}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_role_change_applies_before_token_expires(self):
+        """Test that request.user reflects the current role, not the token's is_trainer claim"""
+        tokens = self.obtain_tokens()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_trainer=False)
+        
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = client.get(self.me_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['user']['is_trainer'])
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['api.backends.CachedModelBackend']
+)
+class CachedSessionAuthenticationTests(TestCase):
+    """Test suite for the cached session/user authentication profile"""
+    
+    def setUp(self):
+        """Set up a logged-in client"""
+        cache.clear()
+        self.me_url = reverse('me')
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!',
+            first_name='Test',
+            last_name='User'
+        )
+        UserProfile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_login(self.user)
+    
+    def test_warm_request_skips_session_and_user_queries(self):
+        """Test that a warm request reads neither the session nor the user table"""
+        self.client.get(self.me_url)
+        
+        # Session, user and both profiles all come from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(self.me_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_user_save_invalidates_cache(self):
+        """Test that saved user and profile changes are seen on the next request"""
+        self.client.get(self.me_url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.experience_level = 'advanced'
+            self.user.profile.save()
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.data['user']['profile']['experience_level'], 'advanced')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renamed'
+            self.user.save()
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.data['user']['first_name'], 'Renamed')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('ChangedPass123!')
+            self.user.save()
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserLoadingQueryTests(TestCase):
+    """Test suite pinning the query cost of me, login and signup"""
+    
+    def setUp(self):
+        """Create a trainer with both profiles"""
+        reset_login_throttle()
+        self.user = CustomUser.objects.create_user(
+            username='trainer',
+            email='trainer@example.com',
+            password='TestPass123!',
+            is_trainer=True
+        )
+        UserProfile.objects.create(user=self.user, experience_level='beginner')
+        TrainerProfile.objects.create(user=self.user, bio='Coach')
+    
+    def test_me_with_session(self):
+        """Test that me costs the session read plus one joined user query"""
+        client = APIClient()
+        client.force_login(self.user)
+        
+        with self.assertNumQueries(2):
+            response = client.get(reverse('me'))
+        
+        self.assertEqual(response.data['user']['profile']['experience_level'], 'beginner')
+        self.assertEqual(response.data['user']['trainer_profile']['bio'], 'Coach')
+    
+    def test_me_with_token(self):
+        """Test that me with a bearer token costs one joined user query"""
+        client = APIClient()
+        tokens = client.post(reverse('token_obtain'), {'login': 'trainer', 'password': 'TestPass123!'}, format='json').data
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        
+        with self.assertNumQueries(1):
+            response = client.get(reverse('me'))
+        
+        self.assertEqual(response.data['user']['trainer_profile']['bio'], 'Coach')
+    
+    def test_login(self):
+        """Test that login loads the user and profiles in one query"""
+        client = APIClient()
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('login'), {'login': 'Trainer@Example.com', 'password': 'TestPass123!'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The rest is session creation and the last_login update
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'django_session' not in query['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('"trainer_profiles"', selects[0])
+        self.assertEqual(response.data['user']['profile']['experience_level'], 'beginner')
+    
+    def test_signup(self):
+        """Test that signup is only its inserts: no pre-checks and no profile reloads"""
+        client = APIClient()
+        data = {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password': 'SecurePass123!',
+            'password2': 'SecurePass123!',
+            'first_name': 'New',
+            'last_name': 'User',
+            'is_trainer': False
+        }
+        
+        # user and profile inserts inside one transaction
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('signup'), data, format='json')
+        
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(all(sql.startswith('INSERT') for sql in statements))
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['trainer_profile'])
+
+
+class LoginThrottleTests(TestCase):
+    """Test suite for login brute-force throttling"""
+    
+    def setUp(self):
+        """Set up test client, a user and empty buckets"""
+        reset_login_throttle()
+        self.client = APIClient()
+        self.login_url = reverse('login')
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+    
+    def attempt(self, login, password='WrongPass123!', ip='10.0.0.1', **extra):
+        return self.client.post(
+            self.login_url, {'login': login, 'password': password}, format='json', REMOTE_ADDR=ip, **extra
+        )
+    
+    @override_settings(LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE=(3, 60))
+    def test_identifier_bucket_rejects_before_lookup_or_hashing(self):
+        """Test that attempts past the identifier's overall burst get 429 without touching the database or hasher"""
+        for ip in ['10.0.0.1', '10.0.0.2', '10.0.0.3']:
+            self.assertEqual(self.attempt('testuser', ip=ip).status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        with patch.object(CustomUser, 'check_password') as check_password, self.assertNumQueries(0):
+            response = self.attempt('TestUser', password='TestPass123!', ip='10.0.0.4')
+        
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        check_password.assert_not_called()
+        
+        # Other accounts from the same addresses are unaffected
+        self.assertEqual(self.attempt('someoneelse', ip='10.0.0.4').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    @override_settings(LOGIN_THROTTLE_IP_RATE=(5, 60))
+    def test_ip_bucket_rejects_credential_stuffing(self):
+        """Test that one address cycling through identifiers is cut off"""
+        for i in range(5):
+            self.assertEqual(self.attempt(f'user{i}').status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.assertEqual(self.attempt('testuser', password='TestPass123!').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            self.attempt('testuser', password='TestPass123!', ip='10.0.0.9').status_code,
+            status.HTTP_200_OK
+        )
+    
+    @override_settings(LOGIN_THROTTLE_IP_RATE=(3, 60))
+    def test_forwarded_for_header_does_not_reset_ip_bucket(self):
+        """Test that rotating client-supplied X-Forwarded-For values still drains the REMOTE_ADDR bucket"""
+        for i in range(3):
+            response = self.attempt(f'user{i}', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        response = self.attempt('user3', HTTP_X_FORWARDED_FOR='203.0.113.99')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    @override_settings(LOGIN_THROTTLE_IDENTIFIER_RATE=(2, 60), LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE=(2, 60))
+    def test_successful_logins_refund_identifier_tokens(self):
+        """Test that only failed attempts count against an account"""
+        for _ in range(4):
+            self.assertEqual(self.attempt('testuser', password='TestPass123!').status_code, status.HTTP_200_OK)
+        
+        self.attempt('testuser')
+        self.attempt('testuser')
+        self.assertEqual(self.attempt('testuser').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    @override_settings(LOGIN_THROTTLE_IDENTIFIER_RATE=(3, 60), LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE=(10, 60))
+    def test_one_address_cannot_lock_out_an_account(self):
+        """Test that failures from one address block that address but not the owner elsewhere"""
+        for _ in range(3):
+            self.assertEqual(self.attempt('testuser', ip='10.6.6.6').status_code, status.HTTP_401_UNAUTHORIZED)
+        for _ in range(5):
+            self.assertEqual(self.attempt('testuser', ip='10.6.6.6').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        response = self.attempt('testuser', password='TestPass123!', ip='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    @override_settings(LOGIN_THROTTLE_IDENTIFIER_RATE=(2, 60))
+    def test_token_endpoint_is_throttled(self):
+        """Test that the token endpoint shares the login buckets"""
+        self.attempt('testuser')
+        self.attempt('testuser')
+        
+        response = self.client.post(
+            reverse('token_obtain'), {'login': 'testuser', 'password': 'TestPass123!'}, format='json', REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    @override_settings(
+        LOGIN_THROTTLE_STORE='api.throttling.CacheBucketStore',
+        LOGIN_THROTTLE_IDENTIFIER_RATE=(2, 60)
+    )
+    def test_cache_store(self):
+        """Test that the shared-cache store enforces the same limits and can be reset"""
+        reset_login_throttle()
+        self.attempt('testuser')
+        self.attempt('testuser')
+        self.assertEqual(self.attempt('testuser').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        reset_login_throttle()
+        self.assertEqual(self.attempt('testuser').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_refund_returns_a_token_up_to_capacity(self):
+        """Test that both stores give back one token without overfilling the bucket"""
+        for store in [LocalMemoryBucketStore(), CacheBucketStore()]:
+            store.clear()
+            self.assertEqual(store.consume('key', 1, 0.01, now=100.0), 0)
+            self.assertGreater(store.consume('key', 1, 0.01, now=100.0), 0)
+            
+            store.refund('key', 1, 0.01, now=100.0)
+            store.refund('key', 1, 0.01, now=100.0)
+            self.assertEqual(store.consume('key', 1, 0.01, now=100.0), 0)
+            self.assertGreater(store.consume('key', 1, 0.01, now=100.0), 0)
+    
+    def test_bucket_refills(self):
+        """Test that a drained bucket regains tokens at burst/period per second"""
+        store = LocalMemoryBucketStore()
+        
+        self.assertEqual(store.consume('key', 2, 0.5, now=100.0), 0)
+        self.assertEqual(store.consume('key', 2, 0.5, now=100.0), 0)
+        self.assertEqual(store.consume('key', 2, 0.5, now=100.0), 2.0)
+        self.assertEqual(store.consume('key', 2, 0.5, now=101.0), 1.0)
+        self.assertEqual(store.consume('key', 2, 0.5, now=102.0), 0)
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordRehashTests(TestCase):
+    """Test suite for upgrading stored password hashes on login"""
+    
+    def setUp(self):
+        """Set up test client and a user whose hash predates the configured cost"""
+        reset_login_throttle()
+        self.client = APIClient()
+        self.login_url = reverse('login')
+        self.user = CustomUser.objects.create_user(username='testuser', email='test@example.com')
+        self.store_password(ConfigurablePBKDF2PasswordHasher(), iterations=500)
+    
+    def store_password(self, hasher, **kwargs):
+        self.user.password = hasher.encode('TestPass123!', hasher.salt(), **kwargs)
+        CustomUser.objects.filter(pk=self.user.pk).update(password=self.user.password)
+    
+    def login(self, password='TestPass123!'):
+        return self.client.post(self.login_url, {'login': 'testuser', 'password': password}, format='json')
+    
+    def stored_password(self):
+        return CustomUser.objects.values_list('password', flat=True).get(pk=self.user.pk)
+    
+    def test_login_upgrades_iteration_count(self):
+        """Test that a hash with fewer iterations is re-hashed at the configured count and the session stays valid"""
+        response = self.login()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.stored_password().startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(self.client.get(reverse('me')).status_code, status.HTTP_200_OK)
+    
+    def test_login_upgrades_outdated_hasher(self):
+        """Test that a hash made by a non-preferred hasher is replaced with the preferred one"""
+        self.store_password(PBKDF2SHA1PasswordHasher(), iterations=500)
+        
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(identify_hasher(self.stored_password()).algorithm, 'pbkdf2_sha256')
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+    
+    def test_login_moves_to_configured_hasher(self):
+        """Test that changing the preferred hasher moves users to it as they log in"""
+        hashers = ['django.contrib.auth.hashers.ScryptPasswordHasher', 'api.hashers.ConfigurablePBKDF2PasswordHasher']
+        with self.settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+            self.assertEqual(identify_hasher(self.stored_password()).algorithm, 'scrypt')
+    
+    def test_current_hash_is_not_rewritten(self):
+        """Test that a hash already at the configured cost is left alone"""
+        self.store_password(ConfigurablePBKDF2PasswordHasher())
+        stored = self.stored_password()
+        
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored_password(), stored)
+    
+    def test_failed_login_keeps_old_hash(self):
+        """Test that a wrong password never triggers a re-hash"""
+        stored = self.stored_password()
+        
+        self.assertEqual(self.login(password='WrongPass123!').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.stored_password(), stored)
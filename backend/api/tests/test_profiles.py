@@ -1,7 +1,9 @@
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from api.models import UserProfile
+from api.models import UserProfile, TrainerProfile, TrainerSpecialty, WorkoutPlan
+from api.profiles import public_profile_cache_key
 
 User = get_user_model()
 
@@ -164,3 +166,176 @@ class UserProfileTests(APITestCase):
         profile = UserProfile.objects.get(user=self.user)
         self.assertEqual(len(profile.fitness_focus), 3)
         self.assertIn("flexibility", profile.fitness_focus)
+
+
+class TrainerDirectoryTests(APITestCase):
+    """Test suite for the trainer directory endpoint"""
+
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="Testpass123!")
+        self.client.force_authenticate(self.viewer)
+        self.directory_url = "/api/trainers/"
+
+        self.strength = self.create_trainer("strong", 10, strength=True)
+        self.cardio = self.create_trainer("runner", 3, cardio=True, sports=True)
+        self.both = self.create_trainer("hybrid", 6, strength=True, cardio=True)
+        self.rehab = self.create_trainer("physio", 15, rehabilitation=True)
+
+        for name, is_deleted in [("Plan A", False), ("Plan B", False), ("Old Plan", True)]:
+            WorkoutPlan.objects.create(
+                name=name, difficulty="beginner", weekly_frequency=3, session_length=45,
+                trainer=self.strength.user, is_deleted=is_deleted
+            )
+
+    def create_trainer(self, username, years, **specialties):
+        user = User.objects.create_user(
+            username=username, email=f"{username}@example.com", password="Testpass123!", is_trainer=True
+        )
+        return TrainerProfile.objects.create(
+            user=user,
+            years_of_experience=years,
+            **{f"specialty_{name}": selected for name, selected in specialties.items()}
+        )
+
+    def usernames(self, response):
+        return [row["username"] for row in response.data["results"]]
+
+    def test_lists_trainers_newest_first(self):
+        """Test that every trainer is listed, newest first, with specialties and program counts"""
+        response = self.client.get(self.directory_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.usernames(response), ["physio", "hybrid", "runner", "strong"])
+        strong = response.data["results"][-1]
+        self.assertEqual(strong["user_id"], self.strength.user.id)
+        self.assertEqual(strong["specialties"], ["strength"])
+        self.assertEqual(strong["program_count"], 2)
+        self.assertEqual(response.data["results"][0]["program_count"], 0)
+
+    def test_filter_by_any_specialty(self):
+        """Test that a multi-specialty filter returns trainers with any of them, once each"""
+        response = self.client.get(self.directory_url, {"specialty": "strength,cardio"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.usernames(response), ["hybrid", "runner", "strong"])
+
+    def test_filter_by_specialty_and_min_years(self):
+        """Test combining specialty and minimum experience filters"""
+        response = self.client.get(self.directory_url, {"specialty": "strength", "min_years": 7})
+
+        self.assertEqual(self.usernames(response), ["strong"])
+
+    def test_directory_page_is_one_query(self):
+        """Test that a page with specialty filters and program counts costs a single query"""
+        self.client.get(self.directory_url)  # warm up authentication
+        with self.assertNumQueries(1):
+            response = self.client.get(self.directory_url, {"specialty": "strength,cardio,sports"})
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_keyset_pagination(self):
+        """Test that pages follow the cursor without overlap"""
+        first = self.client.get(self.directory_url, {"page_size": 3})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(self.usernames(first), ["physio", "hybrid", "runner"])
+        self.assertEqual(self.usernames(second), ["strong"])
+        self.assertIsNone(second.data["next"])
+
+    def test_specialty_rows_follow_profile_updates(self):
+        """Test that changing the specialty flags updates the indexed specialty rows"""
+        self.cardio.specialty_cardio = False
+        self.cardio.specialty_flexibility = True
+        self.cardio.save()
+
+        self.assertEqual(
+            sorted(TrainerSpecialty.objects.filter(trainer=self.cardio).values_list("specialty", flat=True)),
+            ["flexibility", "sports"]
+        )
+        response = self.client.get(self.directory_url, {"specialty": "cardio"})
+        self.assertEqual(self.usernames(response), ["hybrid"])
+
+    def test_invalid_filters(self):
+        """Test that unknown specialties and bad min_years are rejected"""
+        response = self.client.get(self.directory_url, {"specialty": "strength,yoga"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("yoga", response.data["error"])
+
+        response = self.client.get(self.directory_url, {"min_years": "-1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PublicProfileTests(APITestCase):
+    """Test suite for the cached public profile endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            username="trainer", email="trainer@example.com", password="Testpass123!",
+            first_name="Tess", is_trainer=True
+        )
+        self.trainer_profile = TrainerProfile.objects.create(
+            user=self.trainer, bio="Lifting coach", years_of_experience=8, specialty_strength=True
+        )
+        UserProfile.objects.create(
+            user=self.trainer, age=30, experience_level="advanced",
+            training_location="gym", fitness_focus=["strength"]
+        )
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="Testpass123!")
+        self.url = f"/api/users/{self.trainer.id}/profile/"
+
+    def get(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url)
+
+    def test_profile_loads_in_one_query_then_from_cache(self):
+        """Test that a cold view costs one joined query and a warm view none"""
+        self.client.force_authenticate(self.viewer)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["user_profile"]["experience_level"], "advanced")
+        self.assertEqual(response.data["trainer_profile"]["bio"], "Lifting coach")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, response.data)
+
+    def test_email_stays_per_viewer(self):
+        """Test that a cached profile still hides email from everyone but the owner"""
+        self.assertIsNone(self.get(self.viewer).data["email"])
+
+        response = self.get(self.trainer)
+        self.assertEqual(response.data["email"], "trainer@example.com")
+        self.assertTrue(response.data["is_owner"])
+
+        response = self.get(self.viewer)
+        self.assertIsNone(response.data["email"])
+        self.assertFalse(response.data["is_owner"])
+
+    def test_saves_invalidate_cached_profile(self):
+        """Test that saving the user or either profile is visible on the next view"""
+        self.get(self.viewer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trainer.first_name = "Tessa"
+            self.trainer.save()
+            # Nothing is dropped until the change commits
+            self.assertIsNotNone(cache.get(public_profile_cache_key(self.trainer.id)))
+        self.assertIsNone(cache.get(public_profile_cache_key(self.trainer.id)))
+        self.assertEqual(self.get(self.viewer).data["first_name"], "Tessa")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trainer_profile.bio = "Strength and conditioning"
+            self.trainer_profile.save()
+        self.assertEqual(self.get(self.viewer).data["trainer_profile"]["bio"], "Strength and conditioning")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trainer.profile.age = 31
+            self.trainer.profile.save()
+        self.assertEqual(self.get(self.viewer).data["user_profile"]["age"], 31)
+
+    def test_missing_user(self):
+        """Test that unknown users return 404"""
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get("/api/users/999999/profile/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,7 +1,9 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from api.models import UserProfile, WorkoutPlan
+from django.core.cache import cache
+from api.models import UserProfile, WorkoutPlan, PlanFocus
+from api.recommendations import RecommendationEngine, get_catalog_version, invalidate_user_recommendations
 
 User = get_user_model()
 
@@ -11,6 +13,7 @@ class RecommendationsTests(APITestCase):
     """Test suite for workout recommendations"""
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser",
             password="TestPass123!",
@@ -58,6 +61,224 @@ class RecommendationsTests(APITestCase):
         self.assertEqual(response.data['total_recommendations'], 1)
         self.assertEqual(response.data['programs'][0]['name'], "Strength Program")
 
+    def test_plan_focus_rows_follow_focus_changes(self):
+        """Test that the focus lookup table stays in sync with WorkoutPlan.focus"""
+        program = WorkoutPlan.objects.create(
+            name="Mixed Program",
+            trainer=self.trainer,
+            focus=["strength", "balance"],
+            difficulty="beginner",
+            weekly_frequency=3,
+            session_length=45
+        )
+        self.assertEqual(
+            set(PlanFocus.objects.filter(plan=program).values_list('focus', flat=True)),
+            {"strength", "balance"}
+        )
+
+        program.focus = ["flexibility"]
+        program.save()
+
+        self.assertEqual(
+            list(PlanFocus.objects.filter(plan=program).values_list('focus', flat=True)),
+            ["flexibility"]
+        )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 0)
+
+    def test_recommendations_exclude_deleted_programs(self):
+        """Test that soft-deleted programs are never recommended"""
+        self.client.force_authenticate(user=self.user)
+
+        WorkoutPlan.objects.create(
+            name="Deleted Cardio Program",
+            trainer=self.trainer,
+            focus=["cardio"],
+            difficulty="beginner",
+            weekly_frequency=3,
+            session_length=30,
+            is_deleted=True
+        )
+
+        response = self.client.get("/api/recommendations/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_recommendations'], 0)
+
+    def test_recommendations_query_count_is_constant(self):
+        """Test that candidate selection does not grow with the catalog"""
+        self.client.force_authenticate(user=self.user)
+
+        for i in range(10):
+            WorkoutPlan.objects.create(
+                name=f"Program {i}",
+                trainer=self.trainer,
+                focus=["strength"] if i % 2 else ["flexibility"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=45
+            )
+
+        # First request builds the in-memory catalog
+        self.client.get("/api/recommendations/")
+        invalidate_user_recommendations(self.user.id)
+
+        # profile + ranked plans (with trainer) + sections
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/recommendations/")
+
+        self.assertEqual(response.data['total_recommendations'], 5)
+
+    def test_recommendations_are_ranked(self):
+        """Test that closer matches rank first and limit caps the results"""
+        self.client.force_authenticate(user=self.user)
+
+        partial = WorkoutPlan.objects.create(
+            name="Advanced Cardio",
+            trainer=self.trainer,
+            focus=["cardio", "flexibility"],
+            difficulty="advanced",
+            weekly_frequency=5,
+            session_length=90
+        )
+        best = WorkoutPlan.objects.create(
+            name="Beginner Strength & Cardio",
+            trainer=self.trainer,
+            focus=["strength", "cardio"],
+            difficulty="beginner",
+            weekly_frequency=3,
+            session_length=30
+        )
+
+        response = self.client.get("/api/recommendations/")
+
+        self.assertEqual([p['id'] for p in response.data['programs']], [best.id, partial.id])
+        self.assertGreater(
+            response.data['programs'][0]['match_score'],
+            response.data['programs'][1]['match_score']
+        )
+
+        response = self.client.get("/api/recommendations/?limit=1")
+        self.assertEqual(response.data['total_recommendations'], 1)
+        self.assertEqual(response.data['programs'][0]['id'], best.id)
+
+    def test_repeat_recommendations_are_served_from_cache(self):
+        """Test that a repeat load hits the per-user cache without touching the database"""
+        self.client.force_authenticate(user=self.user)
+        WorkoutPlan.objects.create(
+            name="Strength Program",
+            trainer=self.trainer,
+            focus=["strength"],
+            difficulty="beginner",
+            weekly_frequency=3,
+            session_length=45
+        )
+
+        first = self.client.get("/api/recommendations/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/recommendations/")
+
+        self.assertEqual(second.data, first.data)
+
+    def test_plan_changes_invalidate_cached_recommendations(self):
+        """Test that creating or soft-deleting a plan refreshes cached recommendations"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            program = WorkoutPlan.objects.create(
+                name="Cardio Program",
+                trainer=self.trainer,
+                focus=["cardio"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=30
+            )
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            program.is_deleted = True
+            program.save()
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 0)
+
+    def test_profile_save_invalidates_cached_recommendations(self):
+        """Test that updating the profile's focus refreshes that user's recommendations"""
+        self.client.force_authenticate(user=self.user)
+        WorkoutPlan.objects.create(
+            name="Flexibility Program",
+            trainer=self.trainer,
+            focus=["flexibility"],
+            difficulty="beginner",
+            weekly_frequency=2,
+            session_length=30
+        )
+
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put("/api/profile/me/", {
+                "experience_level": "beginner",
+                "training_location": "home",
+                "fitness_focus": ["flexibility"]
+            }, format="json")
+
+        response = self.client.get("/api/recommendations/")
+        self.assertEqual(response.data['total_recommendations'], 1)
+
+    def test_catalog_version_changes_only_on_commit(self):
+        """Test that an uncommitted plan change does not bump the catalog version"""
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            WorkoutPlan.objects.create(
+                name="Uncommitted Program",
+                trainer=self.trainer,
+                focus=["cardio"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=30
+            )
+            self.assertEqual(get_catalog_version(), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_recommendations_invalid_limit(self):
+        """Test that a non-positive limit is rejected"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/recommendations/?limit=0")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_engine_top_k_uses_every_feature(self):
+        """Test engine scoring on a hand-built catalog"""
+        engine = RecommendationEngine(
+            plan_ids=[1, 2, 3, 4],
+            focus=[
+                [True, False, False, False],   # strength
+                [True, False, False, False],   # strength, but popular
+                [False, False, True, False],   # flexibility only
+                [True, True, False, False],    # strength + cardio
+            ],
+            difficulty=[2, 2, 0, 0],
+            session_length=[30, 30, 30, 30],
+            enrollments=[0, 50, 100, 0],
+        )
+
+        ranked = engine.rank(["strength", "cardio"], "beginner", "home", k=3)
+
+        self.assertEqual([plan_id for plan_id, _ in ranked], [4, 2, 1])
+        self.assertEqual(engine.rank(["balance"], "beginner", "home"), [])
+
     def test_recommendations_without_profile(self):
         """Test that users without profile get appropriate message"""
         user_no_profile = User.objects.create_user(
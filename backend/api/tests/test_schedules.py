@@ -1,11 +1,32 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from datetime import date
-from api.models import WorkoutPlan, ProgramSection, UserSchedule
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import json
+from io import StringIO
+from threading import Barrier
+from unittest.mock import patch
+from api.models import (
+    WorkoutPlan, ProgramSection, Exercise, UserSchedule, ScheduleSlot, ScheduleOccurrence, WorkoutSession
+)
+from api import occurrences, views
+from api.occurrences import materialize_active_schedules, users_training_on
 
 User = get_user_model()
 
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def streamed_json(response):
+    """Decode a streamed JSON response body."""
+    return json.loads(b''.join(response.streaming_content))
+
+
 # SCHEDULER TEST CASES
 
 class ScheduleTests(APITestCase):
@@ -59,6 +80,116 @@ class ScheduleTests(APITestCase):
         schedule = UserSchedule.objects.get(user=self.user, is_active=True)
         self.assertTrue(schedule.is_active)
         self.assertIn(self.program, schedule.programs.all())
+        self.assertEqual(response.data['schedule']['weekly_schedule']['monday'], [self.monday_section.id])
+
+    def test_merge_and_remove_programs(self):
+        """Test that a second program stacks on shared days and removal only drops its slots"""
+        self.client.force_authenticate(user=self.user)
+
+        other_program = WorkoutPlan.objects.create(
+            name="Other Program",
+            trainer=self.trainer,
+            focus=["cardio"],
+            difficulty="beginner",
+            weekly_frequency=2,
+            session_length=30
+        )
+        other_section = ProgramSection.objects.create(program=other_program, format="Day 1", order=0)
+
+        self.client.post("/api/schedule/generate/", {"program_id": self.program.id, "start_date": "2026-02-16"}, format="json")
+        response = self.client.post("/api/schedule/generate/", {"program_id": other_program.id}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        weekly_schedule = response.data['schedule']['weekly_schedule']
+        self.assertEqual(weekly_schedule['monday'], [self.monday_section.id, other_section.id])
+        self.assertEqual(weekly_schedule['tuesday'], [self.monday_section.id, other_section.id])
+        self.assertEqual(weekly_schedule['wednesday'], [self.monday_section.id])
+
+        # Indexed lookup: which schedules have this section on Monday
+        self.assertEqual(ScheduleSlot.objects.filter(section=other_section, weekday=0).count(), 1)
+
+        response = self.client.delete(f"/api/schedule/remove-program/{self.program.id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['programs_remaining'], 1)
+        schedule = UserSchedule.objects.get(user=self.user, is_active=True)
+        self.assertEqual(
+            list(schedule.slots.values_list('weekday', 'section_id')),
+            [(0, other_section.id), (1, other_section.id)]
+        )
+
+        response = self.client.get("/api/schedule/workout/2026-02-16/")
+        self.assertEqual(response.data['workouts'][0]['section']['id'], other_section.id)
+
+    def test_one_active_schedule_per_user(self):
+        """Test that the database rejects a second active schedule but allows inactive ones"""
+        schedule = UserSchedule.objects.create(user=self.user, start_date=date(2026, 2, 16), is_active=True)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserSchedule.objects.create(user=self.user, start_date=date(2026, 3, 2), is_active=True)
+
+        schedule.is_active = False
+        schedule.save(update_fields=['is_active'])
+        UserSchedule.objects.create(user=self.user, start_date=date(2026, 1, 5), is_active=False)
+        replacement = UserSchedule.objects.create(user=self.user, start_date=date(2026, 3, 2), is_active=True)
+
+        self.assertEqual(UserSchedule.objects.get(active_user=self.user), replacement)
+
+    def test_generate_retries_after_losing_create_race(self):
+        """Test that an add which loses the race to create the schedule merges into the winner's"""
+        self.client.force_authenticate(user=self.user)
+        winner = UserSchedule.objects.create(user=self.user, start_date=date(2026, 2, 16), is_active=True)
+        locked_active_schedule = views.locked_active_schedule
+        lookups = []
+
+        def stale_then_real(user):
+            # First attempt sees the state from before the concurrent create committed
+            lookups.append(user)
+            return None if len(lookups) == 1 else locked_active_schedule(user)
+
+        with patch('api.views.locked_active_schedule', side_effect=stale_then_real):
+            response = self.client.post("/api/schedule/generate/", {"program_id": self.program.id}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(response.data['schedule']['id'], winner.id)
+        self.assertEqual(UserSchedule.objects.filter(user=self.user).count(), 1)
+
+    def test_check_programs_in_schedule(self):
+        """Test the batch membership check answers a page of programs in two queries"""
+        self.client.force_authenticate(user=self.user)
+        other_program = WorkoutPlan.objects.create(
+            name="Other Program",
+            trainer=self.trainer,
+            focus=["cardio"],
+            difficulty="beginner",
+            weekly_frequency=2,
+            session_length=30
+        )
+        schedule = UserSchedule.objects.create(user=self.user, start_date=date(2026, 2, 16), is_active=True)
+        schedule.programs.add(self.program)
+        ids = f"{self.program.id},{other_program.id},999999"
+
+        # active schedule + through table
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/schedule/check-programs/?ids={ids}")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['schedule_id'], schedule.id)
+        self.assertEqual(response.data['in_schedule'], {
+            str(self.program.id): True,
+            str(other_program.id): False,
+            "999999": False,
+        })
+
+        schedule.is_active = False
+        schedule.save()
+        response = self.client.get(f"/api/schedule/check-programs/?ids={self.program.id}")
+        self.assertEqual(response.data, {'in_schedule': {str(self.program.id): False}, 'schedule_id': None})
+
+        for query in ["", "?ids=", "?ids=1,abc", "?ids=" + ",".join(str(i) for i in range(101))]:
+            response = self.client.get(f"/api/schedule/check-programs/{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_get_active_schedule(self):
         """Test retrieving active schedule"""
@@ -67,8 +198,7 @@ class ScheduleTests(APITestCase):
         schedule = UserSchedule.objects.create(
             user=self.user,
             start_date=date.today(),
-            is_active=True,
-            weekly_schedule={}
+            is_active=True
         )
         schedule.programs.add(self.program)
         
@@ -77,3 +207,389 @@ class ScheduleTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('schedule', response.data)
         self.assertIn('calendar_events', response.data)
+
+    def test_active_schedule_calendar_query_count(self):
+        """Test that the 28-day calendar is built in a constant number of queries"""
+        self.client.force_authenticate(user=self.user)
+
+        slots = []
+        programs = []
+        for i in range(4):
+            program = WorkoutPlan.objects.create(
+                name=f"Program {i}",
+                trainer=self.trainer,
+                focus=["strength"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=45
+            )
+            programs.append(program)
+            for day in ['monday', 'wednesday', 'friday']:
+                section = ProgramSection.objects.create(program=program, format=day.title(), order=i)
+                Exercise.objects.create(section=section, name="Squats", order=0)
+                Exercise.objects.create(section=section, name="Lunges", order=1)
+                slots.append((day, section, program, i))
+
+        schedule = UserSchedule.objects.create(
+            user=self.user,
+            start_date=date(2026, 2, 16),
+            is_active=True
+        )
+        schedule.programs.add(*programs)
+        ScheduleSlot.objects.bulk_create([
+            ScheduleSlot(schedule=schedule, weekday=DAYS.index(day), section=section, program=program, position=position)
+            for day, section, program, position in slots
+        ])
+
+        # schedule + programs (with trainers) + slots + sessions + weekly template
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/schedule/active/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = response.data['calendar_events']
+        self.assertEqual(len(events), 28)
+        self.assertEqual(events[0]['day'], 'monday')
+        self.assertEqual(len(events[0]['sections']), 4)
+        self.assertEqual(events[0]['exercise_count'], 8)
+        self.assertEqual(events[1]['section_type'], 'rest')
+        self.assertEqual(len(response.data['schedule']['program_list']), 4)
+
+    def test_calendar_range(self):
+        """Test expanding the active schedule over an arbitrary date range"""
+        self.client.force_authenticate(user=self.user)
+
+        schedule = UserSchedule.objects.create(
+            user=self.user,
+            start_date=date(2026, 2, 16),
+            is_active=True
+        )
+        schedule.programs.add(self.program)
+        ScheduleSlot.objects.create(schedule=schedule, weekday=0, section=self.monday_section, program=self.program)
+        WorkoutSession.objects.create(user=self.user, date=date(2026, 3, 2), status="completed", is_completed=True)
+
+        # schedule + sessions + weekly template, regardless of range length
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/schedule/calendar/?from=2026-02-01&to=2026-05-31")
+            body = streamed_json(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual((body['from'], body['to']), ("2026-02-01", "2026-05-31"))
+        events = body['calendar_events']
+        # Days before the start date are omitted
+        self.assertEqual(events[0]['date'], "2026-02-16")
+        self.assertEqual(events[-1]['date'], "2026-05-31")
+        self.assertEqual(len(events), 105)
+
+        workout_days = [e['date'] for e in events if e['section_type'] == 'workout']
+        self.assertEqual(len(workout_days), 15)
+        march_2 = next(e for e in events if e['date'] == "2026-03-02")
+        self.assertEqual(march_2['sections'][0]['id'], self.monday_section.id)
+        self.assertEqual(march_2['session_status'], "completed")
+
+    def test_workouts_for_range(self):
+        """Test that a week of workout payloads loads in a fixed number of queries with sections deduplicated"""
+        self.client.force_authenticate(user=self.user)
+
+        schedule = UserSchedule.objects.create(
+            user=self.user,
+            start_date=date(2026, 2, 16),
+            is_active=True
+        )
+        schedule.programs.add(self.program)
+        Exercise.objects.create(section=self.monday_section, name="Bench Press", order=0)
+        Exercise.objects.create(section=self.monday_section, name="Rows", order=1)
+        ScheduleSlot.objects.bulk_create([
+            ScheduleSlot(schedule=schedule, weekday=weekday, section=self.monday_section, program=self.program)
+            for weekday in [0, 2, 4]
+        ])
+        WorkoutSession.objects.create(user=self.user, date=date(2026, 2, 18), status="completed", is_completed=True)
+
+        # schedule + sessions + slots + sections + exercises + sets
+        with self.assertNumQueries(6):
+            response = self.client.get("/api/schedule/workouts/?from=2026-02-16&to=2026-03-01")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['sections']), [str(self.monday_section.id)])
+        self.assertEqual(len(response.data['sections'][str(self.monday_section.id)]['exercises']), 2)
+
+        days = response.data['days']
+        self.assertEqual(len(days), 14)
+        self.assertEqual(sum(1 for day in days if not day['is_rest_day']), 6)
+        self.assertEqual(days[2]['workouts'], [{'program_name': "Test Program", 'section_id': self.monday_section.id}])
+        self.assertEqual(days[2]['total_exercises'], 2)
+        self.assertEqual(days[2]['session_status'], "completed")
+        self.assertTrue(days[1]['is_rest_day'])
+
+        response = self.client.get("/api/schedule/workouts/?from=2026-02-01&to=2026-04-01")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_range_validation(self):
+        """Test that bad or oversized ranges are rejected"""
+        self.client.force_authenticate(user=self.user)
+
+        for query in ["", "?from=2026-02-01", "?from=2026-03-01&to=2026-02-01", "?from=2026-01-01&to=2027-06-01"]:
+            response = self.client.get(f"/api/schedule/calendar/{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SCHEDULE_OCCURRENCE_WEEKS=4)
+class ScheduleOccurrenceTests(APITestCase):
+    """Test suite for materialized schedule occurrences"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="TestPass123!",
+            email="test@example.com"
+        )
+        self.trainer = User.objects.create_user(
+            username="trainer",
+            password="TrainerPass123!",
+            email="trainer@example.com",
+            is_trainer=True
+        )
+        self.program = WorkoutPlan.objects.create(
+            name="Test Program",
+            trainer=self.trainer,
+            focus=["strength"],
+            difficulty="beginner",
+            weekly_frequency=1,
+            session_length=45
+        )
+        self.section = ProgramSection.objects.create(program=self.program, format="Day 1", order=0)
+        Exercise.objects.create(section=self.section, name="Squats", order=0)
+        self.client.force_authenticate(user=self.user)
+
+    def generate(self, program, start_date=None):
+        data = {"program_id": program.id}
+        if start_date:
+            data["start_date"] = start_date.isoformat()
+        return self.client.post("/api/schedule/generate/", data, format="json")
+
+    def test_generate_materializes_window(self):
+        """Test that a new schedule is expanded from today through the configured weeks"""
+        self.generate(self.program, self.today)
+
+        schedule = UserSchedule.objects.get(user=self.user, is_active=True)
+        self.assertEqual(schedule.materialized_from, self.today)
+        self.assertEqual(schedule.materialized_until, self.today + timedelta(days=27))
+        # The single section falls on the template's first day, every 7 days from the start
+        self.assertEqual(
+            list(ScheduleOccurrence.objects.filter(user=self.user).values_list('date', flat=True)),
+            [self.today + timedelta(weeks=week) for week in range(4)]
+        )
+
+    def test_workout_for_date_reads_occurrences(self):
+        """Test that a covered date is answered from the occurrence table"""
+        self.generate(self.program, self.today)
+        workout_date = self.today + timedelta(weeks=1)
+
+        # sessions + schedule + occurrences + exercises + sets
+        with self.assertNumQueries(5):
+            response = self.client.get(f"/api/schedule/workout/{workout_date.isoformat()}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_rest_day'])
+        self.assertEqual(response.data['workouts'][0]['section']['id'], self.section.id)
+
+        response = self.client.get(f"/api/schedule/workout/{(workout_date + timedelta(days=1)).isoformat()}/")
+        self.assertTrue(response.data['is_rest_day'])
+
+    def test_calendar_matches_materialized_and_expanded(self):
+        """Test that the calendar is the same whether read from occurrences or expanded from slots"""
+        self.generate(self.program, self.today)
+        date_from, date_to = self.today, self.today + timedelta(days=20)
+        url = f"/api/schedule/calendar/?from={date_from.isoformat()}&to={date_to.isoformat()}"
+
+        # schedule + sessions + occurrences
+        with self.assertNumQueries(3):
+            materialized = streamed_json(self.client.get(url))['calendar_events']
+
+        with self.settings(SCHEDULE_OCCURRENCE_WEEKS=0):
+            UserSchedule.objects.filter(user=self.user).update(materialized_from=None, materialized_until=None)
+            expanded = streamed_json(self.client.get(url))['calendar_events']
+
+        self.assertEqual(materialized, expanded)
+        self.assertEqual(sum(1 for e in materialized if e['section_type'] == 'workout'), 3)
+
+    def test_incremental_updates(self):
+        """Test that adding, removing and deactivating keep the upcoming occurrences in step"""
+        other_program = WorkoutPlan.objects.create(
+            name="Other Program",
+            trainer=self.trainer,
+            focus=["cardio"],
+            difficulty="beginner",
+            weekly_frequency=1,
+            session_length=30
+        )
+        other_section = ProgramSection.objects.create(program=other_program, format="Day 1", order=0)
+
+        self.generate(self.program, self.today)
+        self.generate(other_program)
+        self.assertEqual(ScheduleOccurrence.objects.filter(program=other_program).count(), 4)
+        occurrences = ScheduleOccurrence.objects.filter(date=self.today)
+        self.assertEqual(list(occurrences.values_list('section_id', flat=True)), [self.section.id, other_section.id])
+
+        self.client.delete(f"/api/schedule/remove-program/{self.program.id}/")
+        self.assertFalse(ScheduleOccurrence.objects.filter(program=self.program).exists())
+        self.assertEqual(ScheduleOccurrence.objects.filter(program=other_program).count(), 4)
+
+        self.client.delete("/api/schedule/deactivate/")
+        self.assertFalse(ScheduleOccurrence.objects.exists())
+        schedule = UserSchedule.objects.get(user=self.user)
+        self.assertIsNone(schedule.materialized_until)
+
+    def test_start_date_change_rematerializes(self):
+        """Test that moving the start date shifts the upcoming occurrences"""
+        self.generate(self.program, self.today)
+        schedule = UserSchedule.objects.get(user=self.user, is_active=True)
+        new_start = self.today + timedelta(days=2)
+
+        self.client.patch(f"/api/schedule/{schedule.id}/update-start-date/", {"start_date": new_start.isoformat()}, format="json")
+
+        dates = list(ScheduleOccurrence.objects.values_list('date', flat=True))
+        self.assertEqual(dates, [new_start + timedelta(weeks=week) for week in range(4)])
+
+    def test_background_job_extends_window(self):
+        """Test that the job only adds the days that rolled into the window"""
+        self.generate(self.program, self.today)
+        next_week = self.today + timedelta(weeks=1)
+
+        touched, days = materialize_active_schedules(next_week)
+        self.assertEqual((touched, days), (1, 7))
+        self.assertEqual(materialize_active_schedules(next_week), (0, 0))
+
+        schedule = UserSchedule.objects.get(user=self.user, is_active=True)
+        self.assertEqual(schedule.materialized_until, next_week + timedelta(days=27))
+        self.assertEqual(ScheduleOccurrence.objects.count(), 5)
+
+        out = StringIO()
+        call_command('materialize_schedules', date=next_week.isoformat(), who_trains=True, stdout=out)
+        self.assertIn(f"Users training on {next_week.isoformat()}: 1", out.getvalue())
+
+    def test_background_job_reads_slots_after_locking_owner(self):
+        """Test that a program removed while the job waits for the owner's lock gets no new occurrences"""
+        self.generate(self.program, self.today)
+        next_week = self.today + timedelta(weeks=1)
+        lock_schedule_owner = occurrences.lock_schedule_owner
+
+        def removed_while_waiting(user_id):
+            # A concurrent remove_program_from_schedule commits just before the lock is granted
+            ScheduleSlot.objects.filter(program=self.program).delete()
+            ScheduleOccurrence.objects.filter(program=self.program).delete()
+            lock_schedule_owner(user_id)
+
+        with patch('api.occurrences.lock_schedule_owner', side_effect=removed_while_waiting) as lock:
+            materialize_active_schedules(next_week)
+
+        lock.assert_called_once_with(self.user.id)
+        self.assertFalse(ScheduleOccurrence.objects.filter(program=self.program).exists())
+
+    @override_settings(SCHEDULE_OCCURRENCE_RETENTION_DAYS=7)
+    def test_background_job_prunes_expired_occurrences(self):
+        """Test that the job deletes occurrences past retention and lookups there fall back to the slots"""
+        self.generate(self.program, self.today)
+        later = self.today + timedelta(weeks=3)
+
+        out = StringIO()
+        call_command('materialize_schedules', date=later.isoformat(), stdout=out)
+        self.assertIn(f"Pruned 2 occurrence(s) before {(later - timedelta(days=7)).isoformat()}", out.getvalue())
+
+        schedule = UserSchedule.objects.get(user=self.user, is_active=True)
+        self.assertEqual(schedule.materialized_from, later - timedelta(days=7))
+        self.assertEqual(
+            min(ScheduleOccurrence.objects.values_list('date', flat=True)),
+            later - timedelta(days=7)
+        )
+        self.assertFalse(schedule.is_materialized(self.today))
+
+        response = self.client.get("/api/schedule/calendar/", {
+            "from": self.today.isoformat(),
+            "to": (self.today + timedelta(days=6)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(streamed_json(response)['calendar_events'][0]['section_type'], 'workout')
+
+    def test_users_training_on(self):
+        """Test the batch 'who trains today' lookup"""
+        self.generate(self.program, self.today)
+        self.assertEqual(list(users_training_on(self.today)), [self.user.id])
+        self.assertEqual(list(users_training_on(self.today + timedelta(days=1))), [])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ScheduleConcurrencyTests(APITransactionTestCase):
+    """
+    Stress test for concurrent schedule mutations.
+    Needs a backend with row locks (MySQL, PostgreSQL); SQLite has none.
+    """
+
+    THREADS = 6
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="TestPass123!",
+            email="test@example.com"
+        )
+        trainer = User.objects.create_user(
+            username="trainer",
+            password="TrainerPass123!",
+            email="trainer@example.com",
+            is_trainer=True
+        )
+        self.programs = []
+        for i in range(self.THREADS):
+            program = WorkoutPlan.objects.create(
+                name=f"Program {i}",
+                trainer=trainer,
+                focus=["strength"],
+                difficulty="beginner",
+                weekly_frequency=2,
+                session_length=45
+            )
+            ProgramSection.objects.create(program=program, format="Day 1", order=0)
+            self.programs.append(program)
+
+    def run_in_parallel(self, request):
+        """Call request(client, argument) for every program at once from a thread pool."""
+        barrier = Barrier(self.THREADS)
+
+        def call(program):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                return request(client, program).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            return list(pool.map(call, self.programs))
+
+    def test_parallel_adds_and_removes(self):
+        """Test that parallel adds end in one schedule holding every program and parallel removes drop them all"""
+        codes = self.run_in_parallel(
+            lambda client, program: client.post("/api/schedule/generate/", {"program_id": program.id}, format="json")
+        )
+
+        self.assertEqual(codes, [status.HTTP_201_CREATED] * self.THREADS)
+        schedule = UserSchedule.objects.get(user=self.user)
+        self.assertTrue(schedule.is_active)
+        self.assertEqual(schedule.programs.count(), self.THREADS)
+        self.assertEqual(schedule.slots.count(), 2 * self.THREADS)
+        # Each day's sections are stacked in distinct positions
+        positions = list(schedule.slots.filter(weekday=0).order_by('position').values_list('position', flat=True))
+        self.assertEqual(positions, list(range(self.THREADS)))
+
+        codes = self.run_in_parallel(
+            lambda client, program: client.delete(f"/api/schedule/remove-program/{program.id}/")
+        )
+
+        self.assertEqual(codes, [status.HTTP_200_OK] * self.THREADS)
+        schedule.refresh_from_db()
+        self.assertFalse(schedule.is_active)
+        self.assertIsNone(schedule.active_user)
+        self.assertEqual(schedule.programs.count(), 0)
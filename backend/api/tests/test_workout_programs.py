@@ -1,7 +1,10 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from api.models import WorkoutPlan
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from datetime import date
+from api.models import WorkoutPlan, ProgramSection, Exercise, ExerciseSet, UserSchedule
 
 User = get_user_model()
 
@@ -182,11 +185,80 @@ class WorkoutProgramTests(APITestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['name'], "Active Program")
 
+    def test_list_programs_cursor_pagination(self):
+        """Test that the catalog pages newest-first by cursor without gaps or repeats"""
+        self.client.force_authenticate(user=self.trainer)
+
+        for i in range(12):
+            WorkoutPlan.objects.create(
+                name=f"Program {i}",
+                trainer=self.trainer,
+                focus=["strength"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=45
+            )
+
+        first_page = self.client.get("/api/programs/?view=summary&page_size=5")
+
+        self.assertEqual(first_page.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', first_page.data)
+        self.assertIsNone(first_page.data['previous'])
+
+        names = [p['name'] for p in first_page.data['results']]
+        next_url = first_page.data['next']
+        while next_url:
+            page = self.client.get(next_url)
+            names.extend(p['name'] for p in page.data['results'])
+            next_url = page.data['next']
+
+        self.assertEqual(names, [f"Program {i}" for i in reversed(range(12))])
+
+    def test_summary_view_returns_counts_without_sections(self):
+        """Test that ?view=summary returns catalog fields and tree counts only"""
+        self.client.force_authenticate(user=self.trainer)
+
+        data = {
+            "name": "Summary Program",
+            "description": "Counts only",
+            "focus": ["strength"],
+            "difficulty": "beginner",
+            "weekly_frequency": 2,
+            "session_length": 45,
+            "sections": [
+                {
+                    "format": "Monday",
+                    "type": "Full Body",
+                    "is_rest_day": False,
+                    "exercises": [
+                        {"name": "Squats", "order": 0, "sets": [
+                            {"set_number": 1, "reps": 10, "time": None, "rest": 60},
+                            {"set_number": 2, "reps": 10, "time": None, "rest": 60}
+                        ]},
+                        {"name": "Plank", "order": 1, "sets": [
+                            {"set_number": 1, "reps": None, "time": 30, "rest": 30}
+                        ]}
+                    ]
+                },
+                {"format": "Tuesday", "type": "", "is_rest_day": True, "exercises": []}
+            ]
+        }
+        self.client.post("/api/programs/", data, format="json")
+
+        response = self.client.get("/api/programs/?view=summary")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        program = response.data['results'][0]
+        self.assertNotIn('sections', program)
+        self.assertEqual(program['day_count'], 1)
+        self.assertEqual(program['exercise_count'], 2)
+        self.assertEqual(program['set_count'], 3)
+
     def test_get_trainer_programs_with_stats(self):
-        """Test getting all programs by trainer (including deleted for stats)"""
+        """Test getting a trainer's program stats (active, deleted, published, enrolled)"""
         self.client.force_authenticate(user=self.trainer)
         
-        WorkoutPlan.objects.create(
+        program = WorkoutPlan.objects.create(
             name="Program 1",
             trainer=self.trainer,
             focus=["strength"],
@@ -194,17 +266,315 @@ class WorkoutProgramTests(APITestCase):
             weekly_frequency=3,
             session_length=45
         )
-        WorkoutPlan.objects.create(
+        hidden = WorkoutPlan.objects.create(
             name="Program 2",
             trainer=self.trainer,
             focus=["cardio"],
             difficulty="intermediate",
             weekly_frequency=4,
             session_length=60,
+            is_published=False
+        )
+        WorkoutPlan.objects.create(
+            name="Program 3",
+            trainer=self.trainer,
+            focus=["cardio"],
+            difficulty="intermediate",
+            weekly_frequency=4,
+            session_length=60,
             is_deleted=True
         )
+        for username, is_active in [("member1", True), ("member2", True), ("member3", False)]:
+            member = User.objects.create_user(username=username, email=f"{username}@example.com", password="MemberPass123!")
+            schedule = UserSchedule.objects.create(user=member, start_date=date(2026, 1, 5), is_active=is_active)
+            schedule.programs.add(program, hidden)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/users/{self.trainer.id}/programs/stats/")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'active_programs': 2,
+            'deleted_programs': 1,
+            'published_programs': 1,
+            'enrolled_schedules': 2,
+        })
+    
+    def test_get_trainer_programs_is_paginated(self):
+        """Test that a trainer's program listing pages through non-deleted programs newest first"""
+        self.client.force_authenticate(user=self.trainer)
+        for i in range(3):
+            WorkoutPlan.objects.create(
+                name=f"Program {i}",
+                trainer=self.trainer,
+                focus=["strength"],
+                difficulty="beginner",
+                weekly_frequency=3,
+                session_length=45,
+                is_deleted=i == 0
+            )
         
-        response = self.client.get(f"/api/users/{self.trainer.id}/programs/?include_deleted=true")
+        first = self.client.get(f"/api/users/{self.trainer.id}/programs/?page_size=1")
+        second = self.client.get(first.data['next'])
         
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in first.data['programs']], ["Program 2"])
+        self.assertEqual([p['name'] for p in second.data['programs']], ["Program 1"])
+        self.assertIsNone(second.data['next'])
+
+
+# QUERY BUDGET TEST CASES
+
+class WorkoutProgramQueryBudgetTests(APITestCase):
+    """Program endpoints must serialize nested trees in a fixed number of queries"""
+
+    # plans (with trainer) + sections + exercises + sets
+    LIST_QUERY_BUDGET = 4
+    # plan (with trainer) + sections + exercises + sets
+    RETRIEVE_QUERY_BUDGET = 4
+
+    def setUp(self):
+        self.trainer = User.objects.create_user(
+            username="trainer",
+            password="TrainerPass123!",
+            email="trainer@example.com",
+            is_trainer=True
+        )
+        self.client.force_authenticate(user=self.trainer)
+
+    def create_program(self, name, days=3, exercises_per_day=3, sets_per_exercise=3):
+        """Create a program with a full sections -> exercises -> sets tree"""
+        program = WorkoutPlan.objects.create(
+            name=name,
+            trainer=self.trainer,
+            focus=["strength"],
+            difficulty="beginner",
+            weekly_frequency=days,
+            session_length=45
+        )
+        for day in range(days):
+            section = ProgramSection.objects.create(program=program, format=f"Day {day + 1}", order=day)
+            for exercise_order in range(exercises_per_day):
+                exercise = Exercise.objects.create(section=section, name=f"Exercise {exercise_order}", order=exercise_order)
+                for set_number in range(1, sets_per_exercise + 1):
+                    ExerciseSet.objects.create(exercise=exercise, set_number=set_number, reps=10, rest=60)
+        return program
+
+    def test_list_programs_query_budget(self):
+        """Test that listing programs does not grow queries with the tree size"""
+        for i in range(5):
+            self.create_program(f"Program {i}")
+
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            response = self.client.get("/api/programs/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(response.data['results'][0]['sections'][0]['exercises'][0]['sets']), 3)
+
+    def test_trainer_programs_query_budget(self):
+        """Test that a trainer's program listing does not grow queries with the tree size"""
+        for i in range(5):
+            self.create_program(f"Program {i}")
+
+        # trainer check + the list budget
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET + 1):
+            response = self.client.get(f"/api/users/{self.trainer.id}/programs/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['programs']), 5)
+        self.assertEqual(len(response.data['programs'][0]['sections'][0]['exercises'][0]['sets']), 3)
+
+    def test_retrieve_program_query_budget(self):
+        """Test that a program's detail view loads its tree in a fixed number of queries"""
+        program = self.create_program("Big Program", days=6, exercises_per_day=8, sets_per_exercise=4)
+
+        with self.assertNumQueries(self.RETRIEVE_QUERY_BUDGET):
+            response = self.client.get(f"/api/programs/{program.id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sections']), 6)
+        self.assertEqual(len(response.data['sections'][5]['exercises']), 8)
+
+    def test_summary_list_does_not_touch_nested_tables(self):
+        """Test that the summary catalog view only queries the plans table"""
+        for i in range(5):
+            self.create_program(f"Program {i}")
+
+        # plans (with trainer) only
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/programs/?view=summary")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_orm_tree_writes_refresh_counts(self):
+        """Test that trees built or trimmed through the ORM keep the denormalized counts right"""
+        with self.captureOnCommitCallbacks(execute=True):
+            program = self.create_program("ORM Program", days=2, exercises_per_day=3, sets_per_exercise=2)
+            ProgramSection.objects.create(program=program, format="Rest", order=2, is_rest_day=True)
+        program.refresh_from_db()
+        self.assertEqual((program.day_count, program.exercise_count, program.set_count), (2, 6, 12))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            program.sections.get(order=0).exercises.first().delete()
+            ExerciseSet.objects.filter(exercise__section__program=program).first().delete()
+        program.refresh_from_db()
+        self.assertEqual((program.day_count, program.exercise_count, program.set_count), (2, 5, 9))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            program.sections.get(order=1).delete()
+        program.refresh_from_db()
+        self.assertEqual((program.day_count, program.exercise_count, program.set_count), (1, 2, 3))
+
+    def test_orm_tree_writes_recount_once_per_plan(self):
+        """Test that a tree built row by row is recounted once on commit, not once per row"""
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                program = self.create_program("ORM Program", days=3, exercises_per_day=3, sets_per_exercise=3)
+        program.refresh_from_db()
+
+        self.assertEqual(len(callbacks), 2)  # the tree recount and the catalog invalidation
+        self.assertEqual((program.day_count, program.exercise_count, program.set_count), (3, 9, 27))
+        # One INSERT per plan, section, exercise and set; focus sync; then lookup, recount and update
+        self.assertLessEqual(len(queries), (1 + 3 + 9 + 27) + 3 + 3)
+
+    def test_orm_tree_writes_after_rollback_are_recounted(self):
+        """Test that writes after a rolled-back savepoint still queue a recount"""
+        with self.captureOnCommitCallbacks(execute=True):
+            program = self.create_program("ORM Program", days=1, exercises_per_day=1, sets_per_exercise=1)
+        # The batch is queued inside the savepoint, so the rollback discards it
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    ProgramSection.objects.create(program=program, format="Day 2", order=1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            ProgramSection.objects.create(program=program, format="Day 3", order=2)
+        program.refresh_from_db()
+        self.assertEqual((program.day_count, program.exercise_count, program.set_count), (2, 1, 1))
+
+    def build_program_payload(self, name, days, exercises_per_day, sets_per_exercise):
+        """Build a nested program payload for the create endpoint"""
+        return {
+            "name": name,
+            "description": "",
+            "focus": ["strength"],
+            "difficulty": "beginner",
+            "weekly_frequency": days,
+            "session_length": 45,
+            "sections": [
+                {
+                    "format": f"Day {day + 1}",
+                    "type": "",
+                    "is_rest_day": False,
+                    "exercises": [
+                        {
+                            "name": f"Exercise {exercise}",
+                            "order": exercise,
+                            "sets": [
+                                {"set_number": n, "reps": 10, "time": None, "rest": 60}
+                                for n in range(1, sets_per_exercise + 1)
+                            ]
+                        }
+                        for exercise in range(exercises_per_day)
+                    ]
+                }
+                for day in range(days)
+            ]
+        }
+
+    def test_create_program_query_count_is_constant(self):
+        """Test that creating a program costs the same queries regardless of its size"""
+        small = self.build_program_payload("Small Program", 1, 1, 1)
+        large = self.build_program_payload("Large Program", 6, 8, 2)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post("/api/programs/", small, format="json")
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.post("/api/programs/", large, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(large_queries), len(small_queries))
+        self.assertEqual(ExerciseSet.objects.filter(exercise__section__program__name="Large Program").count(), 96)
+        self.assertEqual(len(response.data['sections'][5]['exercises'][7]['sets']), 2)
+
+    def test_update_single_rep_change_only_updates(self):
+        """Test that changing one rep count keeps ids and issues no inserts or deletes"""
+        payload = self.build_program_payload("Edited Program", 3, 3, 2)
+        created = self.client.post("/api/programs/", payload, format="json").data
+        program_id = created['id']
+
+        payload['sections'][1]['exercises'][2]['sets'][1]['reps'] = 12
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f"/api/programs/{program_id}/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [q['sql'].split()[0].upper() for q in queries.captured_queries]
+        self.assertNotIn('INSERT', statements)
+        self.assertNotIn('DELETE', statements)
+
+        self.assertEqual(
+            [s['id'] for s in response.data['sections']],
+            [s['id'] for s in created['sections']]
+        )
+        updated_set = response.data['sections'][1]['exercises'][2]['sets'][1]
+        self.assertEqual(updated_set['id'], created['sections'][1]['exercises'][2]['sets'][1]['id'])
+        self.assertEqual(updated_set['reps'], 12)
+
+    def test_update_adds_and_removes_nested_rows(self):
+        """Test that reconciliation inserts new rows and deletes dropped ones"""
+        payload = self.build_program_payload("Edited Program", 3, 2, 2)
+        created = self.client.post("/api/programs/", payload, format="json").data
+        program_id = created['id']
+
+        # Drop the last day, add an exercise to the first, drop a set from the second
+        payload['sections'].pop()
+        payload['sections'][0]['exercises'].append(
+            {"name": "New Exercise", "order": 2, "sets": [{"set_number": 1, "reps": 5, "time": None, "rest": 30}]}
+        )
+        payload['sections'][1]['exercises'][0]['sets'].pop()
+
+        response = self.client.put(f"/api/programs/{program_id}/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ProgramSection.objects.filter(program_id=program_id).count(), 2)
+        self.assertFalse(ProgramSection.objects.filter(id=created['sections'][2]['id']).exists())
+        self.assertEqual(
+            [e['name'] for e in response.data['sections'][0]['exercises']],
+            ["Exercise 0", "Exercise 1", "New Exercise"]
+        )
+        self.assertEqual(len(response.data['sections'][1]['exercises'][0]['sets']), 1)
+        self.assertEqual(response.data['sections'][0]['id'], created['sections'][0]['id'])
+
+        program = WorkoutPlan.objects.get(id=program_id)
+        self.assertEqual(program.exercise_count, 5)
+        self.assertEqual(program.set_count, 8)
+
+    def test_update_matches_sections_by_id(self):
+        """Test that incoming ids take precedence over position when reordering"""
+        payload = self.build_program_payload("Reordered Program", 2, 1, 1)
+        created = self.client.post("/api/programs/", payload, format="json").data
+        program_id = created['id']
+
+        first, second = created['sections']
+        response = self.client.put(f"/api/programs/{program_id}/", {
+            **payload,
+            "sections": [second, first],
+        }, format="json")
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['total_count'], 2)
+        self.assertEqual([s['id'] for s in response.data['sections']], [second['id'], first['id']])
+        self.assertEqual([s['format'] for s in response.data['sections']], ["Day 2", "Day 1"])
+
+    def test_nested_tree_is_ordered(self):
+        """Test that prefetched sections, exercises and sets keep their display order"""
+        program = self.create_program("Ordered Program", days=2, exercises_per_day=2, sets_per_exercise=2)
+        ProgramSection.objects.filter(program=program, order=0).update(order=5)
+
+        response = self.client.get(f"/api/programs/{program.id}/")
+
+        self.assertEqual([s['format'] for s in response.data['sections']], ["Day 2", "Day 1"])
+        sets = response.data['sections'][0]['exercises'][0]['sets']
+        self.assertEqual([s['set_number'] for s in sets], [1, 2])
@@ -0,0 +1,191 @@
+"""
+Login throttling with token buckets.
+
+Every login attempt takes one token from each of three buckets: the client IP,
+the login identifier (username or email, normalized) from that IP, and the
+identifier across all IPs. Buckets refill continuously at burst/period tokens
+per second, so a user who mistypes a password a few times is unaffected while
+a credential-stuffing burst is rejected with 429 before the view looks up a
+user or hashes a password.
+
+A successful login gives its identifier tokens back (refund_login_attempt), so
+only failed attempts count against an account. The tight per-IP identifier
+bucket stops one address from guessing one account's password, and because it
+fills first, a single attacker cannot drain the looser all-IP bucket and lock
+the owner out from elsewhere; that takes many addresses, which is the
+distributed guessing the all-IP bucket exists to cap.
+
+The client IP is DRF's get_ident(), so REST_FRAMEWORK['NUM_PROXIES'] must
+match the deployment: with 0 it is REMOTE_ADDR and a client-supplied
+X-Forwarded-For is ignored.
+
+Buckets live in a pluggable store chosen by LOGIN_THROTTLE_STORE:
+LocalMemoryBucketStore keeps them in this process (exact; single node and
+tests) and CacheBucketStore keeps them in Django's cache so every node shares
+them (read-modify-write, so concurrent requests on different nodes may each
+get a token from the same bucket, which only loosens the limit slightly).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .models import normalize_email
+
+
+def refill(tokens, updated, capacity, refill_rate, now):
+    return min(capacity, tokens + (now - updated) * refill_rate)
+
+
+class LocalMemoryBucketStore:
+    """Token buckets in this process's memory, guarded by a lock."""
+
+    # Beyond this many buckets, full ones are dropped (a full bucket is the default)
+    MAX_BUCKETS = 100_000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now):
+        """Take a token from key's bucket. Returns 0 on success, else seconds until one is available."""
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (capacity, now, capacity, refill_rate))
+            tokens = refill(tokens, updated, capacity, refill_rate, now)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity, refill_rate)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._prune(now)
+            return wait
+
+    def refund(self, key, capacity, refill_rate, now):
+        """Give a token back to key's bucket, never above capacity."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            tokens, updated, _, _ = bucket
+            tokens = min(capacity, refill(tokens, updated, capacity, refill_rate, now) + 1)
+            self._buckets[key] = (tokens, now, capacity, refill_rate)
+
+    def _prune(self, now):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if refill(*bucket, now) < bucket[2]
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets in a Django cache (LOGIN_THROTTLE_CACHE alias), shared by every node."""
+
+    GENERATION_KEY = 'login-throttle:generation'
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'LOGIN_THROTTLE_CACHE', 'default')]
+
+    def _key(self, key):
+        generation = self.cache.get_or_set(self.GENERATION_KEY, 0, None)
+        return f'login-throttle:{generation}:{key}'
+
+    def consume(self, key, capacity, refill_rate, now):
+        """Take a token from key's bucket. Returns 0 on success, else seconds until one is available."""
+        cache_key = self._key(key)
+        tokens, updated = self.cache.get(cache_key, (capacity, now))
+        tokens = refill(tokens, updated, capacity, refill_rate, now)
+        wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+        if not wait:
+            tokens -= 1
+        # An expired entry would have refilled completely anyway
+        self.cache.set(cache_key, (tokens, now), int(capacity / refill_rate) + 1)
+        return wait
+
+    def refund(self, key, capacity, refill_rate, now):
+        """Give a token back to key's bucket, never above capacity."""
+        cache_key = self._key(key)
+        bucket = self.cache.get(cache_key)
+        if bucket is None:
+            return
+        tokens = min(capacity, refill(*bucket, capacity, refill_rate, now) + 1)
+        self.cache.set(cache_key, (tokens, now), int(capacity / refill_rate) + 1)
+
+    def clear(self):
+        """Start every bucket over by moving to a new key generation."""
+        self.cache.get_or_set(self.GENERATION_KEY, 0, None)
+        self.cache.incr(self.GENERATION_KEY)
+
+
+_stores = {}
+
+
+def get_bucket_store():
+    """Return the shared instance of the configured store."""
+    path = settings.LOGIN_THROTTLE_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def reset_login_throttle():
+    get_bucket_store().clear()
+
+
+def refund_login_attempt(request):
+    """Return the identifier tokens a successful login took (see LoginRateThrottle)."""
+    store = get_bucket_store()
+    now = time.time()
+    for key, capacity, refill_rate in getattr(request, 'login_throttle_refunds', []):
+        store.refund(key, capacity, refill_rate, now)
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Throttle login attempts per client IP, per login identifier from that IP
+    and per login identifier overall. Rates are (burst, period in seconds)
+    from LOGIN_THROTTLE_IP_RATE, LOGIN_THROTTLE_IDENTIFIER_RATE and
+    LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE; None disables that bucket.
+    The identifier buckets taken by an allowed request are recorded on it so
+    the view can refund them when the credentials check out.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_buckets(self, request):
+        """(bucket key, rate, refunded on success) for every bucket the attempt draws from."""
+        ip = self.get_ident(request)
+        buckets = [(f'ip:{ip}', settings.LOGIN_THROTTLE_IP_RATE, False)]
+        identifier = request.data.get('login') if hasattr(request.data, 'get') else None
+        if isinstance(identifier, str) and identifier.strip():
+            login = normalize_email(identifier)
+            buckets.append((f'login:{login}:{ip}', settings.LOGIN_THROTTLE_IDENTIFIER_RATE, True))
+            buckets.append((f'login:{login}', settings.LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE, True))
+        return buckets
+
+    def allow_request(self, request, view):
+        store = get_bucket_store()
+        now = time.time()
+        refunds = []
+        for key, rate, refundable in self.get_buckets(request):
+            if rate is None:
+                continue
+            burst, period = rate
+            wait = store.consume(key, burst, burst / period, now)
+            if wait:
+                self.wait_seconds = wait
+                return False
+            if refundable:
+                refunds.append((key, burst, burst / period))
+        request.login_throttle_refunds = refunds
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -16,6 +16,8 @@ urlpatterns = [
     path("auth/login/", views.login_view, name="login"),
     path("auth/logout/", views.logout_view, name="logout"),
     path("auth/me/", views.me, name="me"),
+    path("auth/token/", views.token_obtain_view, name="token_obtain"),
+    path("auth/token/refresh/", views.token_refresh_view, name="token_refresh"),
     
     # ========================================
     # User Profile Endpoints
@@ -28,6 +30,8 @@ urlpatterns = [
     # ========================================
     path("users/<int:user_id>/profile/", views.get_public_profile, name="public_profile"),
     path("users/<int:user_id>/programs/", views.get_trainer_programs, name="trainer_programs"),
+    path("users/<int:user_id>/programs/stats/", views.get_trainer_program_stats, name="trainer_program_stats"),
+    path("trainers/", views.trainer_directory, name="trainer_directory"),
     
     # ========================================
     # Trainer-Only Endpoints
@@ -61,10 +65,13 @@ urlpatterns = [
     # ========================================
     path('schedule/generate/', views.generate_schedule, name='generate-schedule'),
     path('schedule/active/', views.get_active_schedule, name='active-schedule'),
+    path('schedule/calendar/', views.get_schedule_calendar, name='schedule-calendar'),
     path('schedule/workout/<str:date_str>/', views.get_workout_for_date, name='workout-for-date'),
+    path('schedule/workouts/', views.get_workouts_for_range, name='workouts-for-range'),
     path('schedule/deactivate/', views.deactivate_schedule, name='deactivate-schedule'),
     path('schedule/remove-program/<int:program_id>/', views.remove_program_from_schedule, name='remove-program-from-schedule'),  
     path('schedule/check-program/<int:program_id>/', views.check_program_in_schedule, name='check-program-in-schedule'),  
+    path('schedule/check-programs/', views.check_programs_in_schedule, name='check-programs-in-schedule'),
     path('schedule/<int:schedule_id>/update-start-date/', views.update_schedule_start_date),
     path('sessions/start/<str:date_str>/', views.start_workout_session),
     path('sessions/complete/<str:date_str>/', views.complete_workout_session),
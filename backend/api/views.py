@@ -1,11 +1,17 @@
+import json
 import os
 from urllib.parse import urlencode
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
 
-from django.db.models import Q
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Prefetch, Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import login, logout, get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.middleware.csrf import get_token
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -13,19 +19,30 @@ from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_GET
 
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from datetime import datetime
 from django.utils import timezone
 
 
-from .authentication import CsrfExemptSessionAuthentication
+from .authentication import (
+    API_AUTHENTICATION_CLASSES, REFRESH_TOKEN, decode_token, get_token_user, issue_tokens,
+)
+from .pagination import ProgramCursorPagination, TrainerCursorPagination
+from .profiles import get_public_profile_data
+from .throttling import LoginRateThrottle, refund_login_attempt
+from .occurrences import (
+    template_weekday, iter_schedule_days, iter_slot_dates, rebuild_schedule_occurrences, add_program_occurrences,
+    remove_program_occurrences, clear_schedule_occurrences, lock_schedule_owner,
+)
+from .recommendations import get_engine, get_cached_recommendations, cache_recommendations
 from .models import (
     CustomUser,
     UserProfile,
     TrainerProfile,
+    TrainerSpecialty,
     UserSchedule,
     WorkoutPlan,
     WorkoutSession,
@@ -34,6 +51,9 @@ from .models import (
     Exercise,
     ExerciseSet,
     ExerciseTemplate,
+    ScheduleSlot,
+    DAYS_OF_WEEK,
+    TRAINER_SPECIALTIES,
 )
 
 from .serializers import (
@@ -43,7 +63,9 @@ from .serializers import (
     UserScheduleSerializer,
     UserProfileSerializer,
     TrainerProfileSerializer,
+    TrainerDirectorySerializer,
     WorkoutPlanSerializer,
+    WorkoutPlanSummarySerializer,
     WorkoutSessionSerializer,
     WorkoutFeedbackSerializer,
     ProgramSectionSerializer,
@@ -74,6 +96,30 @@ def format_validation_errors(validation_error):
     return formatted_errors
 
 
+def section_tree_prefetch(prefix=''):
+    """Prefetch a section's exercises and their sets in display order (prefix reaches the section)."""
+    return Prefetch(
+        f'{prefix}exercises',
+        queryset=Exercise.objects.order_by('order').prefetch_related(
+            Prefetch('sets', queryset=ExerciseSet.objects.order_by('set_number'))
+        )
+    )
+
+
+def with_program_tree(queryset):
+    """
+    Attach the full sections -> exercises -> sets tree to a WorkoutPlan queryset.
+    Serializing the result with WorkoutPlanSerializer then costs a fixed number
+    of queries regardless of how many programs, sections or sets there are.
+    """
+    return queryset.select_related('trainer').prefetch_related(
+        Prefetch(
+            'sections',
+            queryset=ProgramSection.objects.order_by('order').prefetch_related(section_tree_prefetch())
+        )
+    )
+
+
 # ============================================================================
 # AUTHENTICATION VIEWS
 # ============================================================================
@@ -87,7 +133,7 @@ def csrf(request):
 
 
 @api_view(["POST"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([AllowAny])
 def signup_view(request):
     """Register a new user with optional trainer profile."""
@@ -95,6 +141,7 @@ def signup_view(request):
     
     try:
         serializer.is_valid(raise_exception=True)
+        # Returned with both profiles cached, so serializing it needs no queries
         user = serializer.save()
         return Response(
             UserSerializer(user).data,
@@ -108,8 +155,9 @@ def signup_view(request):
 
 
 @api_view(["POST"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_view(request):
     """Authenticate user and create session."""
     serializer = UserLoginSerializer(data=request.data)
@@ -117,8 +165,10 @@ def login_view(request):
     try:
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
+        refund_login_attempt(request)
         
-        login(request, user)
+        # Several backends are configured (see settings); sessions record the preferred one
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         return Response({
             "ok": True,
             "user": UserSerializer(user).data
@@ -131,6 +181,55 @@ def login_view(request):
         )
 
 
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
+def token_obtain_view(request):
+    """Exchange username and password for an access/refresh token pair."""
+    serializer = UserLoginSerializer(data=request.data)
+    
+    try:
+        serializer.is_valid(raise_exception=True)
+    except ValidationError as e:
+        error_message = str(e.detail[0]) if isinstance(e.detail, list) else str(e.detail)
+        return Response(
+            {"detail": error_message},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    refund_login_attempt(request)
+    return Response(issue_tokens(serializer.validated_data['user']))
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def token_refresh_view(request):
+    """
+    Exchange a refresh token for a new access/refresh token pair. The new
+    refresh token never outlives JWT_REFRESH_TOKEN_MAX_LIFETIME from the
+    original login.
+    """
+    token = request.data.get('refresh')
+    if not token:
+        return Response(
+            {"detail": "refresh is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        claims = decode_token(token, REFRESH_TOKEN)
+        user = get_token_user(claims)
+    except AuthenticationFailed as e:
+        return Response(
+            {"detail": str(e.detail)},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    return Response(issue_tokens(user, claims))
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def logout_view(request):
@@ -140,10 +239,14 @@ def logout_view(request):
 
 
 @api_view(["GET"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def me(request):
-    """Return current authenticated user's data."""
+    """
+    Return current authenticated user's data.
+    The auth backends load request.user with both profiles joined, so this
+    costs no queries beyond authentication.
+    """
     return Response({
         "authenticated": True,
         "user": UserSerializer(request.user).data
@@ -155,7 +258,7 @@ def me(request):
 # ============================================================================
 
 @api_view(["POST"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 
 def create_profile_view(request):
@@ -234,82 +337,132 @@ def get_public_profile(request, user_id):
     """
     Get public profile for any user.
     Returns basic info + trainer profile if they're a trainer.
+    The shared part is cached briefly per user (see profiles.py); email is
+    added per request and only for the owner.
     """
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    data = get_public_profile_data(user_id)
+    if data is None:
         return Response(
             {"detail": "User not found"},
             status=status.HTTP_404_NOT_FOUND
         )
     
     # Check if viewing own profile
-    is_owner = request.user.id == user.id
-    
-    # Get user profile
-    user_profile = None
-    try:
-        profile = user.profile
-        user_profile = {
-            "age": profile.age,
-            "experience_level": profile.experience_level,
-            "training_location": profile.training_location,
-            "fitness_focus": profile.fitness_focus,
-        }
-    except UserProfile.DoesNotExist:
-        pass
-    
-    # Get trainer profile if user is a trainer
-    trainer_profile = None
-    if user.is_trainer:
-        try:
-            trainer_profile = TrainerProfileSerializer(user.trainer_profile).data
-        except TrainerProfile.DoesNotExist:
-            pass
+    is_owner = request.user.id == data["id"]
     
     return Response({
-        "id": user.id,
-        "username": user.username,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email if is_owner else None,  # Only show email to owner
-        "is_trainer": user.is_trainer,
+        **data,
+        "email": request.user.email if is_owner else None,  # Only show email to owner
         "is_owner": is_owner,
-        "user_profile": user_profile,
-        "trainer_profile": trainer_profile,
     }, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_trainer_programs(request, user_id):
-    """Get all workout programs created by a specific trainer."""
-    try:
-        user = User.objects.get(id=user_id, is_trainer=True)
-    except User.DoesNotExist:
+    """
+    Get a trainer's non-deleted workout programs, newest first.
+    Keyset-paginated (?cursor=, ?page_size=) with the nested tree prefetched;
+    counts live in get_trainer_program_stats.
+    """
+    if not User.objects.filter(id=user_id, is_trainer=True).exists():
         return Response(
             {"detail": "Trainer not found"},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Check if we should include deleted programs (for stats)
-    include_deleted = request.GET.get('include_deleted', 'false').lower() == 'true'
-    
-    if include_deleted:
-        # For stats: return all programs including deleted
-        programs = WorkoutPlan.objects.filter(trainer=user).order_by('-created_at')
-    else:
-        # For display: return only non-deleted programs
-        programs = WorkoutPlan.objects.filter(trainer=user, is_deleted=False).order_by('-created_at')
-    
-    serializer = WorkoutPlanSerializer(programs, many=True)
+    programs = with_program_tree(WorkoutPlan.objects.filter(trainer_id=user_id, is_deleted=False))
+    paginator = ProgramCursorPagination()
+    page = paginator.paginate_queryset(programs, request)
     
     return Response({
-        "programs": serializer.data,
-        "total_count": programs.count()
+        "programs": WorkoutPlanSerializer(page, many=True).data,
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
     }, status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_trainer_program_stats(request, user_id):
+    """
+    Get program counts for a trainer from one conditional aggregate:
+    active, deleted and published programs, plus active schedules
+    enrolled in any of their active programs.
+    """
+    if not User.objects.filter(id=user_id, is_trainer=True).exists():
+        return Response(
+            {"detail": "Trainer not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # The schedules join repeats plan rows, so every count is distinct
+    stats = WorkoutPlan.objects.filter(trainer_id=user_id).aggregate(
+        active_programs=Count('id', filter=Q(is_deleted=False), distinct=True),
+        deleted_programs=Count('id', filter=Q(is_deleted=True), distinct=True),
+        published_programs=Count('id', filter=Q(is_deleted=False, is_published=True), distinct=True),
+        enrolled_schedules=Count(
+            'user_schedules',
+            filter=Q(is_deleted=False, user_schedules__is_active=True),
+            distinct=True
+        ),
+    )
+    
+    return Response(stats, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def trainer_directory(request):
+    """
+    Browse trainers, newest first, with keyset pagination (?cursor=, ?page_size=).
+    Optional ?specialty=strength,cardio keeps trainers with any of the listed
+    specialties and ?min_years= sets a minimum years of experience.
+    Each row carries the trainer's program count, computed in the same query.
+    """
+    specialties = sorted({
+        specialty.strip().lower()
+        for specialty in request.GET.get('specialty', '').split(',') if specialty.strip()
+    })
+    unknown = [specialty for specialty in specialties if specialty not in TRAINER_SPECIALTIES]
+    if unknown:
+        return Response(
+            {"error": f"Unknown specialty: {', '.join(unknown)}. Choose from: {', '.join(TRAINER_SPECIALTIES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        min_years = int(request.GET.get('min_years', 0))
+        if min_years < 0:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"error": "min_years must be a non-negative integer"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    program_count = (
+        WorkoutPlan.objects.filter(trainer=OuterRef('user_id'), is_deleted=False)
+        .order_by().values('trainer').annotate(count=Count('id')).values('count')
+    )
+    trainers = (
+        TrainerProfile.objects.filter(user__is_trainer=True, user__is_active=True)
+        .select_related('user')
+        .annotate(program_count=Coalesce(Subquery(program_count), 0))
+    )
+    if specialties:
+        # Semi-join on the (specialty, trainer) index; a trainer matching several specialties appears once
+        trainers = trainers.filter(
+            id__in=TrainerSpecialty.objects.filter(specialty__in=specialties).values('trainer_id')
+        )
+    if min_years:
+        trainers = trainers.filter(years_of_experience__gte=min_years)
+    
+    paginator = TrainerCursorPagination()
+    page = paginator.paginate_queryset(trainers, request)
+    return paginator.get_paginated_response(TrainerDirectorySerializer(page, many=True).data)
+
+
 # ============================================================================
 # TRAINER PROFILE VIEWS
 # ============================================================================
@@ -357,17 +510,37 @@ class WorkoutProgramViewSet(viewsets.ModelViewSet):
     """ViewSet for managing workout plans/programs."""
     serializer_class = WorkoutPlanSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProgramCursorPagination
+
+    def is_summary_view(self):
+        """Whether the client asked for the lightweight catalog representation."""
+        return (
+            self.action in ('list', 'retrieve')
+            and self.request.query_params.get('view') == 'summary'
+        )
+
+    def get_serializer_class(self):
+        """Use the summary serializer for ?view=summary reads."""
+        if self.is_summary_view():
+            return WorkoutPlanSummarySerializer
+        return WorkoutPlanSerializer
 
     def get_queryset(self):
         """Return all non-deleted workout programs ordered by creation date."""
-        return WorkoutPlan.objects.filter(is_deleted=False).select_related('trainer').order_by('-created_at')
+        queryset = WorkoutPlan.objects.filter(is_deleted=False).select_related('trainer').order_by('-id')
+        # Full read actions serialize the whole nested tree, so load it up front
+        if self.action in ('list', 'retrieve') and not self.is_summary_view():
+            queryset = with_program_tree(queryset)
+        return queryset
 
     def perform_create(self, serializer):
         """Set the trainer to the current user when creating a new plan."""
         # Check if user is a trainer
         if not self.request.user.is_trainer:
             raise ValidationError({"detail": "Only trainers can create workout programs"})
-        serializer.save(trainer=self.request.user)
+        plan = serializer.save(trainer=self.request.user)
+        # Reload with the nested tree so the response is serialized in constant queries
+        serializer.instance = with_program_tree(WorkoutPlan.objects.filter(pk=plan.pk)).get()
     
     def update(self, request, *args, **kwargs):
         """Update a workout program with nested sections, exercises, and sets."""
@@ -390,7 +563,8 @@ class WorkoutProgramViewSet(viewsets.ModelViewSet):
         # Call the serializer's custom update method directly
         updated_instance = serializer.update(instance, serializer.validated_data)
         
-        # Serialize the updated instance for response
+        # Serialize the updated instance (with its nested tree reloaded) for response
+        updated_instance = with_program_tree(WorkoutPlan.objects.filter(pk=updated_instance.pk)).get()
         response_serializer = self.get_serializer(updated_instance)
         return Response(response_serializer.data)
 
@@ -433,13 +607,33 @@ class WorkoutFeedbackViewSet(viewsets.ModelViewSet):
             session__user=self.request.user
         ).order_by('-created_at')
 
+RECOMMENDATION_LIMIT = 20
+MAX_RECOMMENDATION_LIMIT = 100
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_recommendations(request):
     """
-    Get workout program recommendations based on user's fitness focuses.
-    Returns programs that share at least one focus with the user's profile.
+    Get ranked workout program recommendations for the user's profile.
+    Candidates share at least one focus with the profile and are scored on
+    focus overlap, difficulty, session length and popularity (best first).
+    Optional ?limit= caps the number of programs returned.
     """
+    try:
+        limit = int(request.GET.get('limit', RECOMMENDATION_LIMIT))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'error': 'limit must be a positive integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(limit, MAX_RECOMMENDATION_LIMIT)
+
+    cached = get_cached_recommendations(request.user.id, limit)
+    if cached is not None:
+        return Response(cached, status=status.HTTP_200_OK)
+
     try:
         # Get user's profile
         user_profile = UserProfile.objects.get(user=request.user)
@@ -452,27 +646,37 @@ def get_recommendations(request):
                 'programs': []
             }, status=status.HTTP_200_OK)
         
-        # Get all non-deleted programs
-        all_programs = WorkoutPlan.objects.filter(is_deleted=False)
-        
-        # Filter programs that have at least one matching focus
-        recommended_programs = []
-        for program in all_programs:
-            program_focuses = program.focus
-            if program_focuses:
-                # Check if there's any overlap between user focuses and program focuses
-                matching_focuses = set(user_focuses) & set(program_focuses)
-                if matching_focuses:
-                    recommended_programs.append(program)
+        # Score the whole catalog in memory and keep the top matches
+        engine = get_engine()
+        ranked = engine.rank(
+            user_focuses,
+            user_profile.experience_level,
+            user_profile.training_location,
+            k=limit
+        )
+        programs_by_id = {
+            program.id: program
+            for program in with_program_tree(
+                WorkoutPlan.objects.filter(id__in=[plan_id for plan_id, _ in ranked], is_deleted=False)
+            )
+        }
+        ranked = [(programs_by_id[plan_id], score) for plan_id, score in ranked if plan_id in programs_by_id]
         
-        # Serialize the programs
-        serializer = WorkoutPlanSerializer(recommended_programs, many=True)
+        # Serialize the programs in ranked order
+        serializer = WorkoutPlanSerializer([program for program, _ in ranked], many=True)
+        programs = [
+            {**program_data, 'match_score': round(score, 4)}
+            for program_data, (_, score) in zip(serializer.data, ranked)
+        ]
         
-        return Response({
+        payload = {
             'user_focuses': user_focuses,
-            'total_recommendations': len(recommended_programs),
-            'programs': serializer.data
-        }, status=status.HTTP_200_OK)
+            'total_recommendations': len(programs),
+            'programs': programs
+        }
+        cache_recommendations(request.user.id, limit, payload, engine.version)
+        
+        return Response(payload, status=status.HTTP_200_OK)
         
     except UserProfile.DoesNotExist:
         return Response({
@@ -607,7 +811,7 @@ def build_reset_url(request, uid, token):
 
 
 @api_view(["POST"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([AllowAny])
 def password_reset_confirm(request):
     """Confirm password reset with token and set new password."""
@@ -633,7 +837,7 @@ def password_reset_confirm(request):
 
 
 @api_view(["POST"])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([AllowAny])
 def password_reset(request):
     """
@@ -649,8 +853,175 @@ def password_reset(request):
 # SCHEDULE VIEWS
 # ============================================================================
 
+def section_summary(entry):
+    """Calendar summary of a slot or occurrence annotated with exercise_count."""
+    return {
+        'id': entry.section.id,
+        'name': entry.section.format,
+        'type': entry.section.type,
+        'exercise_count': entry.exercise_count,
+        'program_id': entry.program.id,
+        'program_name': entry.program.name,
+        'focus': entry.program.focus,
+    }
+
+
+def load_weekly_template(schedule):
+    """
+    Load a schedule's slots in one query and group their section summaries by weekday.
+    Returns {day_name: [section summary, ...]} for all seven days.
+    """
+    slots = (
+        schedule.slots.select_related('section', 'program')
+        .annotate(exercise_count=Count('section__exercises'))
+        .order_by('weekday', 'position')
+    )
+    template = {day_name: [] for day_name in DAYS_OF_WEEK}
+    for slot in slots:
+        template[DAYS_OF_WEEK[slot.weekday]].append(section_summary(slot))
+    return template
+
+
+def iter_materialized_days(schedule, date_from, date_to):
+    """
+    Read a schedule's occurrences in [date_from, date_to] in one streamed range query.
+    Yields (date, [section summary, ...]) in date order for dates with workouts.
+    """
+    occurrences = (
+        schedule.occurrences.filter(date__range=[date_from, date_to])
+        .select_related('section', 'program')
+        .annotate(exercise_count=Count('section__exercises'))
+        .order_by('date', 'position')
+    )
+    for event_date, group in groupby(occurrences.iterator(), key=attrgetter('date')):
+        yield event_date, [section_summary(occurrence) for occurrence in group]
+
+
+def iter_calendar_days(schedule, sections_for, status_by_date, date_from, date_to):
+    """
+    Yield one calendar entry per day from date_from to date_to (inclusive).
+    sections_for(event_date, day_name) supplies the day's section summaries.
+    Days before the schedule's start date are skipped.
+    """
+    for event_date, weekday in iter_schedule_days(schedule, date_from, date_to):
+        day_name = DAYS_OF_WEEK[weekday]
+        sections = sections_for(event_date, day_name)
+        yield {
+            'date': event_date.isoformat(),
+            'day': day_name,
+            'sections': sections,
+            'section_type': 'workout' if sections else 'rest',
+            'exercise_count': sum(section['exercise_count'] for section in sections),
+            'session_status': status_by_date.get(event_date),
+        }
+
+
+def build_calendar(schedule, user, date_from, date_to):
+    """
+    Expand a schedule over a date range in constant queries (sessions + occurrences or slots).
+    Ranges inside the materialized window are read from ScheduleOccurrence directly.
+    Returns a generator of calendar entries, so long ranges are never held in memory at once.
+    """
+    sessions = WorkoutSession.objects.filter(
+        user=user,
+        date__range=[date_from, date_to]
+    ).values_list('date', 'status')
+    status_by_date = dict(sessions)
+    if schedule.is_materialized(max(date_from, schedule.start_date), date_to):
+        materialized_days = iter_materialized_days(schedule, date_from, date_to)
+        pending = next(materialized_days, None)
+
+        def sections_for(event_date, day_name):
+            # Days are asked for in order, so step through the occurrence groups alongside them
+            nonlocal pending
+            while pending is not None and pending[0] < event_date:
+                pending = next(materialized_days, None)
+            if pending is not None and pending[0] == event_date:
+                return pending[1]
+            return []
+    else:
+        template = load_weekly_template(schedule)
+
+        def sections_for(event_date, day_name):
+            return template[day_name]
+    return iter_calendar_days(schedule, sections_for, status_by_date, date_from, date_to)
+
+
+def iter_json_object(payload, key, items):
+    """Yield payload as JSON text with `key` holding a streamed array of items."""
+    prefix = json.dumps(payload)[:-1]
+    yield f'{prefix}{", " if payload else ""}{json.dumps(key)}: ['
+    for index, item in enumerate(items):
+        yield f'{", " if index else ""}{json.dumps(item)}'
+    yield ']}'
+
+
+def iter_scheduled_entries(schedule, date_from, date_to):
+    """
+    Yield (date, slot or occurrence) for every scheduled section in [date_from, date_to],
+    in display order. Reads occurrences in one range query when the range is materialized,
+    otherwise expands the weekly slots. Entries carry their program (select_related).
+    """
+    date_from = max(date_from, schedule.start_date)
+    if schedule.is_materialized(date_from, date_to):
+        occurrences = (
+            schedule.occurrences.filter(date__range=[date_from, date_to])
+            .select_related('program')
+            .order_by('date', 'position')
+        )
+        for occurrence in occurrences:
+            yield occurrence.date, occurrence
+        return
+
+    slots = schedule.slots.select_related('program').order_by('weekday', 'position')
+    yield from iter_slot_dates(schedule, slots, date_from, date_to)
+
+
+def parse_date_range(request, max_days):
+    """
+    Read ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+    Returns (date_from, date_to, None) or (None, None, error response).
+    """
+    try:
+        date_from = datetime.strptime(request.GET.get('from', ''), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.GET.get('to', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None, None, Response(
+            {"error": "from and to are required. Use YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if date_to < date_from:
+        return None, None, Response(
+            {"error": "to must not be before from"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if (date_to - date_from).days + 1 > max_days:
+        return None, None, Response(
+            {"error": f"Range cannot exceed {max_days} days"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return date_from, date_to, None
+
+
+SCHEDULE_WRITE_ATTEMPTS = 2
+
+
+def locked_active_schedule(user):
+    """Return the user's active schedule locked FOR UPDATE, or None. Call inside a transaction."""
+    lock_schedule_owner(user.pk)
+    return UserSchedule.objects.select_for_update().filter(user=user, is_active=True).first()
+
+
+def active_schedules():
+    """UserSchedule queryset with programs (and their trainers) and slots prefetched for serialization."""
+    return UserSchedule.objects.prefetch_related(
+        Prefetch('programs', queryset=WorkoutPlan.objects.select_related('trainer')),
+        'slots',
+    )
+
 @api_view(['POST'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def generate_schedule(request):
     """
@@ -675,90 +1046,101 @@ def generate_schedule(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Check if user already has this program in their schedule
-    try:
-        existing_schedule = UserSchedule.objects.get(user=request.user, is_active=True)
-        if program in existing_schedule.programs.all():
-            return Response(
-                {"error": "This program is already in your schedule"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    except UserSchedule.DoesNotExist:
-        existing_schedule = None
-    
     # Get program sections (workout days)
-    sections = program.sections.filter(is_rest_day=False).order_by('order')
+    sections = list(program.sections.filter(is_rest_day=False).order_by('order'))
     
-    if sections.count() == 0:
+    if len(sections) == 0:
         return Response(
             {"error": "Program has no workout sections"},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Determine start date
+    start_date = None
     if start_date_str:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-    else:
-        if existing_schedule:
-            start_date = existing_schedule.start_date
-        else:
-            today = datetime.now().date()
-            days_until_monday = (7 - today.weekday()) % 7
-            if days_until_monday == 0:
-                days_until_monday = 7
-            start_date = today + timedelta(days=days_until_monday)
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
     
-    # Build schedule for this program
-    days_of_week = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    program_schedule = {}
+    # Assign program sections to weekdays
+    rest_days = [d.lower() for d in rest_days]
+    program_days = []
     
     frequency = min(program.weekly_frequency, 7)
     section_index = 0
-    days_scheduled = 0
-    
-    for day in days_of_week:
-        if day in [d.lower() for d in rest_days]:
-            program_schedule[day] = []
-        elif days_scheduled < frequency and section_index < sections.count():
-            program_schedule[day] = [sections[section_index].id]
-            section_index += 1
-            days_scheduled += 1
-            
-            if section_index >= sections.count():
-                section_index = 0
-        else:
-            program_schedule[day] = []
+    
+    for weekday, day in enumerate(DAYS_OF_WEEK):
+        if day in rest_days or len(program_days) >= frequency:
+            continue
+        program_days.append((weekday, sections[section_index]))
+        section_index = (section_index + 1) % len(sections)
+    
+    for attempt in range(SCHEDULE_WRITE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return add_program_to_schedule(request.user, program, program_days, start_date)
+        except IntegrityError:
+            # A concurrent request created the active schedule first; retry to merge into it
+            if attempt == SCHEDULE_WRITE_ATTEMPTS - 1:
+                raise
+
+
+def add_program_to_schedule(user, program, program_days, start_date):
+    """
+    Merge program_days into the user's active schedule, creating it if needed.
+    Must run inside a transaction: the active schedule row stays locked until
+    commit so concurrent adds and removes for the same user apply one at a time.
+    """
+    existing_schedule = locked_active_schedule(user)
+    
+    # Check if user already has this program in their schedule
+    if existing_schedule and existing_schedule.programs.filter(id=program.id).exists():
+        return Response(
+            {"error": "This program is already in your schedule"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     # Merge with existing schedule or create new one
     if existing_schedule:
-        # Merge the schedules
-        merged_schedule = existing_schedule.weekly_schedule.copy()
-        for day, section_ids in program_schedule.items():
-            if day not in merged_schedule:
-                merged_schedule[day] = []
-            elif merged_schedule[day] == 'rest':
-                merged_schedule[day] = []
-            
-            # Add new sections to this day
-            if isinstance(merged_schedule[day], list):
-                merged_schedule[day].extend(section_ids)
-            else:
-                merged_schedule[day] = section_ids
-        
-        existing_schedule.weekly_schedule = merged_schedule
-        existing_schedule.save()
-        existing_schedule.programs.add(program)
-        
         schedule = existing_schedule
+        # New sections go after whatever is already planned on each day
+        last_positions = dict(
+            schedule.slots.values('weekday').annotate(last=Max('position')).values_list('weekday', 'last')
+        )
     else:
-        # Create new schedule
+        if start_date is None:
+            today = timezone.localdate()
+            days_until_monday = (7 - today.weekday()) % 7
+            if days_until_monday == 0:
+                days_until_monday = 7
+            start_date = today + timedelta(days=days_until_monday)
+        # Raises IntegrityError if another request just created one
         schedule = UserSchedule.objects.create(
-            user=request.user,
+            user=user,
             start_date=start_date,
-            weekly_schedule=program_schedule,
             is_active=True
         )
-        schedule.programs.add(program)
+        last_positions = {}
+    
+    ScheduleSlot.objects.bulk_create([
+        ScheduleSlot(
+            schedule=schedule,
+            weekday=weekday,
+            section=section,
+            program=program,
+            position=last_positions.get(weekday, -1) + 1
+        )
+        for weekday, section in program_days
+    ])
+    schedule.programs.add(program)
+    if existing_schedule:
+        add_program_occurrences(schedule, program)
+    else:
+        rebuild_schedule_occurrences(schedule)
+    schedule = active_schedules().get(id=schedule.id)
     
     serializer = UserScheduleSerializer(schedule)
     return Response({
@@ -768,18 +1150,10 @@ def generate_schedule(request):
 
 
 @api_view(['DELETE'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def remove_program_from_schedule(request, program_id):
     """Remove a specific program from the user's schedule."""
-    try:
-        schedule = UserSchedule.objects.get(user=request.user, is_active=True)
-    except UserSchedule.DoesNotExist:
-        return Response(
-            {"error": "No active schedule found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
     try:
         program = WorkoutPlan.objects.get(id=program_id)
     except WorkoutPlan.DoesNotExist:
@@ -788,41 +1162,40 @@ def remove_program_from_schedule(request, program_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    if program not in schedule.programs.all():
-        return Response(
-            {"error": "Program not in schedule"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Get sections from this program
-    program_sections = list(program.sections.values_list('id', flat=True))
-    
-    # Remove these sections from the weekly schedule
-    updated_schedule = {}
-    for day, section_ids in schedule.weekly_schedule.items():
-        if isinstance(section_ids, list):
-            # Filter out sections from this program
-            updated_schedule[day] = [sid for sid in section_ids if sid not in program_sections]
-        else:
-            updated_schedule[day] = section_ids
-    
-    schedule.weekly_schedule = updated_schedule
-    schedule.programs.remove(program)
-    
-    # If no programs left, deactivate schedule
-    if schedule.programs.count() == 0:
-        schedule.is_active = False
-    
-    schedule.save()
+    with transaction.atomic():
+        schedule = locked_active_schedule(request.user)
+        if schedule is None:
+            return Response(
+                {"error": "No active schedule found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if not schedule.programs.filter(id=program.id).exists():
+            return Response(
+                {"error": "Program not in schedule"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Drop this program's slots from the weekly schedule
+        schedule.slots.filter(program=program).delete()
+        schedule.programs.remove(program)
+        remove_program_occurrences(schedule, program)
+        programs_remaining = schedule.programs.count()
+        
+        # If no programs left, deactivate schedule
+        if programs_remaining == 0:
+            schedule.is_active = False
+            schedule.save()
+            clear_schedule_occurrences(schedule)
     
     return Response({
         "message": "Program removed from schedule",
-        "programs_remaining": schedule.programs.count()
+        "programs_remaining": programs_remaining
     }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def check_program_in_schedule(request, program_id):
     """Check if a program is in the user's active schedule."""
@@ -830,7 +1203,7 @@ def check_program_in_schedule(request, program_id):
         schedule = UserSchedule.objects.get(user=request.user, is_active=True)
         program = WorkoutPlan.objects.get(id=program_id)
         
-        is_in_schedule = program in schedule.programs.all()
+        is_in_schedule = schedule.programs.filter(id=program.id).exists()
         
         return Response({
             "in_schedule": is_in_schedule,
@@ -845,79 +1218,72 @@ def check_program_in_schedule(request, program_id):
         )
 
 
+MAX_MEMBERSHIP_IDS = 100
+
+
+@api_view(['GET'])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
+@permission_classes([IsAuthenticated])
+def check_programs_in_schedule(request):
+    """
+    Check which of ?ids=1,2,3 are in the user's active schedule.
+    Returns {"in_schedule": {"<id>": bool}, "schedule_id": id or null} in two queries.
+    Unknown program ids are reported as not in the schedule.
+    """
+    try:
+        program_ids = list(dict.fromkeys(
+            int(program_id) for program_id in request.GET.get('ids', '').split(',') if program_id.strip()
+        ))
+    except ValueError:
+        return Response(
+            {"error": "ids must be a comma-separated list of program ids"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not program_ids:
+        return Response(
+            {"error": "ids is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(program_ids) > MAX_MEMBERSHIP_IDS:
+        return Response(
+            {"error": f"At most {MAX_MEMBERSHIP_IDS} ids per request"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    schedule_id = (
+        UserSchedule.objects.filter(user=request.user, is_active=True)
+        .values_list('id', flat=True)
+        .first()
+    )
+    scheduled_ids = set()
+    if schedule_id is not None:
+        scheduled_ids = set(
+            UserSchedule.programs.through.objects.filter(
+                userschedule_id=schedule_id,
+                workoutplan_id__in=program_ids
+            ).values_list('workoutplan_id', flat=True)
+        )
+    
+    return Response({
+        "in_schedule": {str(program_id): program_id in scheduled_ids for program_id in program_ids},
+        "schedule_id": schedule_id
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def get_active_schedule(request):
     """Get user's current active workout schedule with merged programs."""
     try:
-        schedule = UserSchedule.objects.get(user=request.user, is_active=True)
+        schedule = active_schedules().get(user=request.user, is_active=True)
         serializer = UserScheduleSerializer(schedule)
         
         # Add calendar events for the next 4 weeks
-        calendar_events = []
         start_date = schedule.start_date
         end_date = start_date + timedelta(days=27)  # 4 weeks = 28 days
-        sessions = WorkoutSession.objects.filter(
-            user=request.user,
-            date__range=[start_date, end_date]
-        )
-        status_by_date = {s.date.isoformat(): s.status for s in sessions}
-        days_of_week = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        
-        for week in range(4):
-            for day_index, day_name in enumerate(days_of_week):
-                event_date = start_date + timedelta(days=week * 7 + day_index)
-                section_ids = schedule.weekly_schedule.get(day_name, [])
-                
-                if not section_ids or section_ids == 'rest':
-                    calendar_events.append({
-                        'date': event_date.isoformat(),
-                        'day': day_name,
-                        'sections': [],
-                        'section_type': 'rest',
-                        'exercise_count': 0,
-                        'session_status': status_by_date.get(event_date.isoformat())
-                    })
-                else:
-                    # Get all sections for this day
-                    sections = []
-                    total_exercises = 0
-                    
-                    # Handle both list and single ID formats
-                    if not isinstance(section_ids, list):
-                        section_ids = [section_ids] if section_ids != 'rest' else []
-                    
-                    # FIXED: Proper indentation here
-                    for section_id in section_ids:
-                        try:
-                            section = ProgramSection.objects.get(id=section_id)
-                            exercise_count = section.exercises.count()
-                            total_exercises += exercise_count
-                            
-                            sections.append({
-                                'id': section.id,
-                                'name': section.format,
-                                'type': section.type,
-                                'exercise_count': exercise_count,
-                                # NEW: Add program information
-                                'program_id': section.program.id,
-                                'program_name': section.program.name,
-                                'focus': section.program.focus,
-                            })
-                        except ProgramSection.DoesNotExist:
-                            pass
-                    
-                    # FIXED: This needs to be at the same level as the for loop above
-                    calendar_events.append({
-                        'date': event_date.isoformat(),
-                        'day': day_name,
-                        'sections': sections,
-                        'section_type': 'workout' if sections else 'rest',
-                        'exercise_count': total_exercises,
-                        'session_status': status_by_date.get(event_date.isoformat())
-                        
-                    })
+        calendar_events = list(build_calendar(schedule, request.user, start_date, end_date))
         
         return Response({
             'schedule': serializer.data,
@@ -930,19 +1296,49 @@ def get_active_schedule(request):
             'schedule': None,
             'calendar_events': []
         }, status=status.HTTP_200_OK)
-@api_view(['PATCH'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+
+
+MAX_CALENDAR_DAYS = 366
+
+
+@api_view(['GET'])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
-def update_schedule_start_date(request, schedule_id):
-    """Update the start date of a schedule."""
+def get_schedule_calendar(request):
+    """
+    Get calendar entries for the active schedule over ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+    Ranges may span up to a year; days before the schedule's start are omitted.
+    The entries are streamed as they are expanded.
+    """
+    date_from, date_to, error = parse_date_range(request, MAX_CALENDAR_DAYS)
+    if error:
+        return error
+    
     try:
-        schedule = UserSchedule.objects.get(id=schedule_id, user=request.user, is_active=True)
+        schedule = UserSchedule.objects.get(user=request.user, is_active=True)
     except UserSchedule.DoesNotExist:
-        return Response(
-            {"error": "Schedule not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+        return Response({
+            'message': 'No active schedule found',
+            'calendar_events': []
+        }, status=status.HTTP_200_OK)
     
+    # Entries are written out as they are expanded rather than collected first
+    return StreamingHttpResponse(
+        iter_json_object({
+            'schedule_id': schedule.id,
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+        }, 'calendar_events', build_calendar(schedule, request.user, date_from, date_to)),
+        content_type='application/json',
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['PATCH'])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
+@permission_classes([IsAuthenticated])
+def update_schedule_start_date(request, schedule_id):
+    """Update the start date of a schedule."""
     new_start_date = request.data.get('start_date')
     if not new_start_date:
         return Response(
@@ -951,20 +1347,35 @@ def update_schedule_start_date(request, schedule_id):
         )
     
     try:
-        schedule.start_date = datetime.strptime(new_start_date, '%Y-%m-%d').date()
-        schedule.save()
-        
-        return Response({
-            "message": "Start date updated successfully",
-            "new_start_date": schedule.start_date.isoformat()
-        }, status=status.HTTP_200_OK)
+        start_date = datetime.strptime(new_start_date, '%Y-%m-%d').date()
     except ValueError:
         return Response(
             {"error": "Invalid date format. Use YYYY-MM-DD"},
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    with transaction.atomic():
+        lock_schedule_owner(request.user.pk)
+        try:
+            schedule = UserSchedule.objects.select_for_update().get(
+                id=schedule_id, user=request.user, is_active=True
+            )
+        except UserSchedule.DoesNotExist:
+            return Response(
+                {"error": "Schedule not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        schedule.start_date = start_date
+        schedule.save()
+        rebuild_schedule_occurrences(schedule)
+    
+    return Response({
+        "message": "Start date updated successfully",
+        "new_start_date": schedule.start_date.isoformat()
+    }, status=status.HTTP_200_OK)
 @api_view(['GET'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def get_workout_for_date(request, date_str):
     """Get all workouts for a specific date (merged from multiple programs)."""
@@ -985,15 +1396,20 @@ def get_workout_for_date(request, date_str):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Calculate which day of the week this is
-    day_name = target_date.strftime('%A').lower()
-    section_ids = schedule.weekly_schedule.get(day_name, [])
-    
-    # Handle both list and single ID formats
-    if not isinstance(section_ids, list):
-        section_ids = [section_ids] if section_ids != 'rest' else []
+    # Load the day's sections with their full exercise trees, from the
+    # materialized occurrences when the date is covered
+    if schedule.is_materialized(target_date):
+        entries = schedule.occurrences.filter(date=target_date).order_by('position')
+    elif target_date < schedule.start_date:
+        entries = schedule.occurrences.none()
+    else:
+        entries = schedule.slots.filter(weekday=template_weekday(schedule.start_date, target_date))
+    slots = list(
+        entries.select_related('section', 'program')
+        .prefetch_related(section_tree_prefetch('section__'))
+    )
     
-    if not section_ids or section_ids == 'rest':
+    if not slots:
         return Response({
             'date': date_str,
             'is_rest_day': True,
@@ -1003,17 +1419,13 @@ def get_workout_for_date(request, date_str):
         }, status=status.HTTP_200_OK)
     
     # Get all sections for this day
-    workouts = []
-    for section_id in section_ids:
-        try:
-            section = ProgramSection.objects.get(id=section_id)
-            serializer = ProgramSectionSerializer(section)
-            workouts.append({
-                'program_name': section.program.name,
-                'section': serializer.data
-            })
-        except ProgramSection.DoesNotExist:
-            pass
+    workouts = [
+        {
+            'program_name': slot.program.name,
+            'section': ProgramSectionSerializer(slot.section).data
+        }
+        for slot in slots
+    ]
     
     return Response({
         'date': date_str,
@@ -1023,8 +1435,71 @@ def get_workout_for_date(request, date_str):
         'session_status': session_status
     }, status=status.HTTP_200_OK)
 
+MAX_WORKOUT_RANGE_DAYS = 31
+
+
+@api_view(['GET'])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
+@permission_classes([IsAuthenticated])
+def get_workouts_for_range(request):
+    """
+    Get the workouts for every day in ?from=YYYY-MM-DD&to=YYYY-MM-DD (up to 31 days).
+    Each section's full payload appears once under `sections`, keyed by id; days
+    reference sections by id since the same section repeats every week.
+    """
+    date_from, date_to, error = parse_date_range(request, MAX_WORKOUT_RANGE_DAYS)
+    if error:
+        return error
+    
+    try:
+        schedule = UserSchedule.objects.get(user=request.user, is_active=True)
+    except UserSchedule.DoesNotExist:
+        return Response(
+            {"error": "No active schedule found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    status_by_date = dict(
+        WorkoutSession.objects.filter(
+            user=request.user,
+            date__range=[date_from, date_to]
+        ).values_list('date', 'status')
+    )
+    entries_by_date = {}
+    for event_date, entry in iter_scheduled_entries(schedule, date_from, date_to):
+        entries_by_date.setdefault(event_date, []).append(entry)
+    
+    # Load each distinct section's tree once for the whole range
+    section_ids = {entry.section_id for entries in entries_by_date.values() for entry in entries}
+    sections = ProgramSection.objects.filter(id__in=section_ids).prefetch_related(section_tree_prefetch())
+    section_payloads = {section.id: ProgramSectionSerializer(section).data for section in sections}
+    
+    days = []
+    event_date = date_from
+    while event_date <= date_to:
+        entries = entries_by_date.get(event_date, [])
+        days.append({
+            'date': event_date.isoformat(),
+            'is_rest_day': not entries,
+            'workouts': [
+                {'program_name': entry.program.name, 'section_id': entry.section_id}
+                for entry in entries
+            ],
+            'total_exercises': sum(len(section_payloads[entry.section_id]['exercises']) for entry in entries),
+            'session_status': status_by_date.get(event_date),
+        })
+        event_date += timedelta(days=1)
+    
+    return Response({
+        'schedule_id': schedule.id,
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'sections': {str(section_id): payload for section_id, payload in section_payloads.items()},
+        'days': days
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def start_workout_session(request, date_str):
     """Create (or reuse) today's session and mark it in_progress."""
@@ -1054,7 +1529,7 @@ def start_workout_session(request, date_str):
 
 
 @api_view(['POST'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def complete_workout_session(request, date_str):
     """Mark today's session completed."""
@@ -1096,14 +1571,18 @@ def complete_workout_session(request, date_str):
     }, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
-@authentication_classes([CsrfExemptSessionAuthentication])
+@authentication_classes(API_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def deactivate_schedule(request):
     """Deactivate the user's current schedule."""
-    updated_count = UserSchedule.objects.filter(
-        user=request.user,
-        is_active=True
-    ).update(is_active=False)
+    with transaction.atomic():
+        lock_schedule_owner(request.user.pk)
+        schedules = list(UserSchedule.objects.select_for_update().filter(user=request.user, is_active=True))
+        updated_count = UserSchedule.objects.filter(
+            id__in=[schedule.id for schedule in schedules]
+        ).update(is_active=False, active_user=None)
+        for schedule in schedules:
+            clear_schedule_occurrences(schedule)
     
     return Response({
         'message': f'Deactivated {updated_count} schedule(s)',
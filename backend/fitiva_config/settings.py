@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'api.middleware.LegacySessionBackendMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -91,6 +92,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default (single process, tests). In production point
+# CACHE_BACKEND/CACHE_LOCATION at a shared backend, e.g.
+# django.core.cache.backends.redis.RedisCache with redis://redis:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'fitiva'),
+    }
+}
+
+
+# Schedule occurrences
+# Weeks of ScheduleOccurrence rows kept materialized ahead of today for active
+# schedules (extended by `manage.py materialize_schedules`). 0 disables the table
+# and schedule lookups expand the weekly slots on the fly.
+
+SCHEDULE_OCCURRENCE_WEEKS = int(os.getenv('SCHEDULE_OCCURRENCE_WEEKS', '8'))
+# Days of past occurrences kept; older rows are pruned by the same command.
+SCHEDULE_OCCURRENCE_RETENTION_DAYS = int(os.getenv('SCHEDULE_OCCURRENCE_RETENTION_DAYS', '30'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -113,6 +138,27 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (api.hashers)
+# PASSWORD_HASHER picks the hasher new and re-hashed passwords use:
+# pbkdf2_sha256 (default), scrypt, argon2 or bcrypt_sha256 (the last two need
+# the argon2-cffi / bcrypt packages). The other hashers stay listed so existing
+# hashes still verify; any hash not made with the preferred hasher and its
+# current parameters is upgraded on the user's next successful login.
+# Measure candidates with `manage.py benchmark_password_hashers`.
+
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2_sha256': 'api.hashers.ConfigurablePBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -137,13 +183,41 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'api.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Reverse proxies in front of the app; throttles key on the address they saw.
+    # 0 uses REMOTE_ADDR and ignores client-supplied X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
+
+# Stateless token authentication (api.authentication.JWTAuthentication)
+# Lifetimes are in seconds. Set JWT_SIGNING_KEY to rotate tokens separately from SECRET_KEY.
+
+JWT_SIGNING_KEY = os.getenv('JWT_SIGNING_KEY', SECRET_KEY)
+JWT_ALGORITHM = 'HS256'
+JWT_ACCESS_TOKEN_LIFETIME = int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME', '900'))
+JWT_REFRESH_TOKEN_LIFETIME = int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME', str(7 * 24 * 60 * 60)))
+# Absolute cap from the original login; refreshing never extends a token past it
+JWT_REFRESH_TOKEN_MAX_LIFETIME = int(os.getenv('JWT_REFRESH_TOKEN_MAX_LIFETIME', str(30 * 24 * 60 * 60)))
+
+# Login throttling (api.throttling.LoginRateThrottle)
+# Rates are (burst, seconds to refill the whole burst); None disables a bucket.
+# The identifier rates are per account from one client IP and per account from
+# all IPs; successful logins give their identifier tokens back. Set NUM_PROXIES
+# (REST_FRAMEWORK above) to the number of proxies in front of the app.
+# Use api.throttling.CacheBucketStore with a shared CACHE_BACKEND when running
+# more than one node.
+
+LOGIN_THROTTLE_STORE = os.getenv('LOGIN_THROTTLE_STORE', 'api.throttling.LocalMemoryBucketStore')
+LOGIN_THROTTLE_IP_RATE = (30, 60)
+LOGIN_THROTTLE_IDENTIFIER_RATE = (10, 300)
+LOGIN_THROTTLE_IDENTIFIER_TOTAL_RATE = (50, 3600)
+
 # CSRF settings (allow frontend to access CSRF cookie and send it back in requests)
 CSRF_TRUSTED_ORIGINS = [ "http://localhost:3000", ]
 
@@ -177,6 +251,23 @@ LOGGING = {
 }
 
 # Session configuration
+# Fast-auth profile: SESSION_ENGINE=django.contrib.sessions.backends.cached_db
+# and AUTH_USER_CACHE=true serve sessions and session users from CACHES, so a
+# warm session request needs no session or user query. Point CACHE_BACKEND at
+# a shared cache (e.g. Redis) when running more than one process. Compare with
+# `manage.py benchmark_auth`. Only one backend is listed, so a failed
+# authenticate() hashes the password once. Sessions recorded under the other
+# backends (before a deploy or an AUTH_USER_CACHE flip) are moved onto it by
+# api.middleware.LegacySessionBackendMiddleware.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+AUTH_USER_CACHE = os.getenv('AUTH_USER_CACHE', 'false').lower() in ('1', 'true', 'yes')
+AUTHENTICATION_BACKENDS = [
+    'api.backends.CachedModelBackend' if AUTH_USER_CACHE else 'api.backends.ProfileModelBackend',
+]
+LEGACY_AUTHENTICATION_BACKENDS = [
+    'api.backends.ProfileModelBackend' if AUTH_USER_CACHE else 'api.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_SECURE = False  # Set to True when the project is ready for "production" with HTTPS
@@ -53,6 +53,13 @@ type WorkoutProgram = {
   created_at: string;
 };
 
+type ProgramStats = {
+  active_programs: number;
+  deleted_programs: number;
+  published_programs: number;
+  enrolled_schedules: number;
+};
+
 type ProfileForm = {
   age: string;
   experience_level: string;
@@ -127,6 +134,9 @@ export default function ProfileViewPage() {
   // Profile state
   const [profile, setProfile] = useState<PublicProfile | null>(null);
   const [programs, setPrograms] = useState<WorkoutProgram[]>([]);
+  const [programsNext, setProgramsNext] = useState<string | null>(null);
+  const [programsLoadingMore, setProgramsLoadingMore] = useState(false);
+  const [programStats, setProgramStats] = useState<ProgramStats | null>(null);
   const [pageLoading, setPageLoading] = useState(true);
 
   // Modal state
@@ -169,10 +179,17 @@ export default function ProfileViewPage() {
         // Load programs if trainer
         if (profileData.is_trainer) {
           try {
-            const programsData = await publicProfileAPI.getTrainerPrograms(Number(profileId));
+            const [programsData, statsData] = await Promise.all([
+              publicProfileAPI.getTrainerPrograms(Number(profileId)),
+              publicProfileAPI.getTrainerProgramStats(Number(profileId)).catch(() => null),
+            ]);
             setPrograms(programsData.programs);
+            setProgramsNext(programsData.next);
+            setProgramStats(statsData);
           } catch {
             setPrograms([]);
+            setProgramsNext(null);
+            setProgramStats(null);
           }
         }
       } catch (err) {
@@ -187,6 +204,25 @@ export default function ProfileViewPage() {
     }
   }, [user, authLoading, profileId, isOwnProfile]);
 
+  // ========================================
+  // Event Handlers - Programs
+  // ========================================
+
+  const handleLoadMorePrograms = async () => {
+    if (!programsNext) return;
+
+    try {
+      setProgramsLoadingMore(true);
+      const programsData = await publicProfileAPI.getTrainerPrograms(Number(profileId), programsNext);
+      setPrograms((prev) => [...prev, ...programsData.programs]);
+      setProgramsNext(programsData.next);
+    } catch (err) {
+      console.error('Failed to load more programs:', err);
+    } finally {
+      setProgramsLoadingMore(false);
+    }
+  };
+
   // ========================================
   // Event Handlers - Profile Updates
   // ========================================
@@ -566,7 +602,14 @@ export default function ProfileViewPage() {
         {profile.is_trainer && (
           <div className="profile-section">
             <div className="section-header">
-              <h2 className="section-title">My Programs</h2>
+              <div>
+                <h2 className="section-title">My Programs</h2>
+                {programStats && (
+                  <p className="section-subtitle">
+                    {programStats.active_programs} active · {programStats.published_programs} published · {programStats.enrolled_schedules} enrolled
+                  </p>
+                )}
+              </div>
               {isOwnProfile && (
                 <Link href="/create-program" className="create-program button">
                 <button
@@ -604,6 +647,18 @@ export default function ProfileViewPage() {
                 ))}
               </div>
             )}
+
+            {programsNext && (
+              <div className="load-more-container">
+                <button
+                  className="load-more-button"
+                  onClick={handleLoadMorePrograms}
+                  disabled={programsLoadingMore}
+                >
+                  {programsLoadingMore ? 'Loading...' : 'Load more programs'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
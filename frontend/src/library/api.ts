@@ -252,8 +252,8 @@ export const publicProfileAPI = {
     });
 },
 
-  // Get trainer's workout programs
-  getTrainerPrograms: async (userId: number): Promise<{
+  // Get one page of a trainer's programs; pass the previous page's `next` URL to continue
+  getTrainerPrograms: async (userId: number, nextUrl?: string | null): Promise<{
     programs: Array<{
       id: number;
       name: string;
@@ -266,9 +266,24 @@ export const publicProfileAPI = {
       created_at: string;
       updated_at: string;
     }>;
-    total_count: number;
+    next: string | null;
+    previous: string | null;
   }> => {
-    return fetchAPI(`/api/users/${userId}/programs/`, {
+    const cursor = nextUrl ? new URL(nextUrl).searchParams.get('cursor') : null;
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return fetchAPI(`/api/users/${userId}/programs/${query}`, {
+      method: 'GET',
+    });
+  },
+
+  // Get trainer's program counts
+  getTrainerProgramStats: async (userId: number): Promise<{
+    active_programs: number;
+    deleted_programs: number;
+    published_programs: number;
+    enrolled_schedules: number;
+  }> => {
+    return fetchAPI(`/api/users/${userId}/programs/stats/`, {
       method: 'GET',
     });
   },